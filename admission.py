@@ -0,0 +1,327 @@
+"""
+Admission control for the tool endpoints: per-client rate limits and a bounded wait queue
+"""
+
+import asyncio
+import hashlib
+import hmac
+import json
+import math
+import os
+import secrets
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from fastjson import FastJSONResponse
+from jsonrpc import INVALID_REQUEST, RATE_LIMITED, SERVER_OVERLOADED, rpc_error
+from metrics import ADMISSION_ACTIVE, ADMISSION_QUEUE_DEPTH, ADMISSION_REQUESTS
+
+# Sustained requests per second and burst size allowed per client (0 disables rate limiting)
+RATE = float(os.environ.get("ADMISSION_RATE", "10"))
+BURST = float(os.environ.get("ADMISSION_BURST", "20"))
+
+# Tool requests executing at once, and how many more may wait (and for how long) before load is shed
+MAX_CONCURRENT = int(os.environ.get("ADMISSION_MAX_CONCURRENT", "32"))
+QUEUE_SIZE = int(os.environ.get("ADMISSION_QUEUE_SIZE", "64"))
+QUEUE_TIMEOUT = float(os.environ.get("ADMISSION_QUEUE_TIMEOUT", "5"))
+
+# Token buckets kept, least recently seen clients are forgotten first
+MAX_CLIENTS = int(os.environ.get("ADMISSION_MAX_CLIENTS", "10000"))
+
+# Reverse proxies in front of the server that append to X-Forwarded-For (1 on Railway, Fly and
+# Render). Entries left of those hops are client-supplied and never trusted; 0 ignores the header.
+TRUSTED_PROXIES = int(os.environ.get("ADMISSION_TRUSTED_PROXIES", "0"))
+
+# Key signing the Mcp-Session-Id handed out on initialize. Generated at import when unset, so
+# pre-forked workers share it; set it to keep sessions valid across restarts and replicas.
+SESSION_SECRET = os.environ.get("ADMISSION_SESSION_SECRET", "").encode() or secrets.token_bytes(32)
+
+# Only tool endpoints are admitted; /health, /metrics and /tools are never queued
+ADMITTED_PATHS = ("/mcp", "/products", "/episodes")
+
+
+class Rejected(Exception):
+    """A request turned away by admission control"""
+
+    def __init__(self, code: int, message: str, status: int, retry_after: float):
+        super().__init__(message)
+        self.code = code
+        self.status = status
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Refills rate tokens per second up to burst"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated_at = time.monotonic()
+
+    def take(self, cost: float = 1.0) -> float:
+        """Spend cost tokens; returns 0 on success or the seconds until they would be available"""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return 0.0
+        return (cost - self.tokens) / self.rate
+
+
+class AdmissionController:
+    """Per-client token buckets in front of a global concurrency limit with a bounded wait queue"""
+
+    def __init__(self, rate: float = RATE, burst: float = BURST, max_concurrent: int = MAX_CONCURRENT,
+                 queue_size: int = QUEUE_SIZE, queue_timeout: float = QUEUE_TIMEOUT,
+                 max_clients: int = MAX_CLIENTS):
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self.max_concurrent = max_concurrent
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.max_clients = max_clients
+        # Execution slots in use; a batch holds one per message
+        self.active = 0
+        self.waiting = 0
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._waiters: "Deque[Tuple[int, asyncio.Future]]" = deque()
+
+    def check_rate(self, client: str, cost: float = 1.0):
+        """Charge client's bucket, raising Rejected once it is empty or cost can never fit in it"""
+        if self.rate <= 0:
+            return
+        if cost > self.burst:
+            ADMISSION_REQUESTS.inc(result="too_large")
+            raise Rejected(INVALID_REQUEST, f"Invalid Request: batch of {cost:.0f} messages exceeds "
+                           f"the limit of {self.burst:.0f} per client", 400, 0)
+        bucket = self._buckets.get(client)
+        if bucket is None:
+            bucket = self._buckets[client] = TokenBucket(self.rate, self.burst)
+            while len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(client)
+        wait = bucket.take(cost)
+        if wait:
+            ADMISSION_REQUESTS.inc(result="rate_limited")
+            raise Rejected(RATE_LIMITED, f"Rate limit exceeded, retry in {wait:.1f}s", 429, wait)
+
+    def slots(self, cost: int) -> int:
+        """Execution slots a request of cost messages holds; a batch larger than the limit takes them all"""
+        return min(cost, self.max_concurrent)
+
+    async def acquire(self, slots: int = 1):
+        """Take execution slots, waiting in the bounded queue (in arrival order) if too few are free"""
+        if self.max_concurrent <= 0:
+            return
+        if not self._waiters and self.active + slots <= self.max_concurrent:
+            self.active += slots
+            ADMISSION_ACTIVE.set(self.active)
+            ADMISSION_REQUESTS.inc(result="admitted")
+            return
+        if self.waiting >= self.queue_size:
+            ADMISSION_REQUESTS.inc(result="shed")
+            raise Rejected(SERVER_OVERLOADED, "Server overloaded, retry shortly", 503, 1.0)
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append((slots, waiter))
+        self.waiting += 1
+        ADMISSION_QUEUE_DEPTH.set(self.waiting)
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            # The slots may have been granted just as the wait ran out
+            if waiter.cancelled():
+                ADMISSION_REQUESTS.inc(result="timed_out")
+                raise Rejected(SERVER_OVERLOADED, "Server overloaded, retry shortly", 503, 1.0)
+        except BaseException:
+            if waiter.done() and not waiter.cancelled():
+                self.release(slots)
+            raise
+        finally:
+            self.waiting -= 1
+            ADMISSION_QUEUE_DEPTH.set(self.waiting)
+            # A waiter that gave up may have been blocking smaller ones behind it
+            self._grant()
+        ADMISSION_REQUESTS.inc(result="queued")
+
+    def release(self, slots: int = 1):
+        if self.max_concurrent <= 0:
+            return
+        self.active -= slots
+        ADMISSION_ACTIVE.set(self.active)
+        self._grant()
+
+    def _grant(self):
+        """Hand freed slots to queued requests in arrival order"""
+        while self._waiters:
+            slots, waiter = self._waiters[0]
+            if waiter.done():
+                self._waiters.popleft()
+                continue
+            if self.active + slots > self.max_concurrent:
+                break
+            self._waiters.popleft()
+            self.active += slots
+            ADMISSION_ACTIVE.set(self.active)
+            waiter.set_result(None)
+
+
+def _sign(nonce: str, secret: bytes = SESSION_SECRET) -> str:
+    return hmac.new(secret, nonce.encode(), hashlib.sha256).hexdigest()[:32]
+
+
+def mint_session(secret: bytes = SESSION_SECRET) -> str:
+    """A new Mcp-Session-Id; only ids carrying this server's signature are honoured"""
+    nonce = secrets.token_urlsafe(16)
+    return f"{nonce}.{_sign(nonce, secret)}"
+
+
+def valid_session(session: str, secret: bytes = SESSION_SECRET) -> bool:
+    nonce, _, signature = session.partition(".")
+    return bool(nonce) and hmac.compare_digest(signature, _sign(nonce, secret))
+
+
+def client_key(scope: Dict[str, Any], trusted_proxies: int = TRUSTED_PROXIES) -> str:
+    """Identify the caller's IP address"""
+    headers = dict(scope.get("headers") or [])
+    forwarded = headers.get(b"x-forwarded-for")
+    if trusted_proxies > 0 and forwarded:
+        # Each trusted proxy appends the address it saw; the client can only prepend
+        hops = [hop.strip() for hop in forwarded.decode("latin-1").split(",") if hop.strip()]
+        if hops:
+            return "ip:" + hops[-min(trusted_proxies, len(hops))]
+    client = scope.get("client")
+    return "ip:" + (client[0] if client else "unknown")
+
+
+def session_key(scope: Dict[str, Any]) -> Optional[str]:
+    """The caller's session, if it presents one this server issued"""
+    headers = dict(scope.get("headers") or [])
+    session = headers.get(b"mcp-session-id", b"").decode("latin-1")
+    if session and valid_session(session):
+        return "session:" + session
+    return None
+
+
+def is_initialize(body: bytes) -> bool:
+    """Whether a single JSON-RPC message opens an MCP session"""
+    if b'"initialize"' not in body:
+        return False
+    try:
+        message = json.loads(body)
+    except ValueError:
+        return False
+    return isinstance(message, dict) and message.get("method") == "initialize"
+
+
+def is_result(body: bytes) -> bool:
+    """Whether a response body is a successful single JSON-RPC result"""
+    try:
+        message = json.loads(body)
+    except ValueError:
+        return False
+    return isinstance(message, dict) and "result" in message and "error" not in message
+
+
+def message_count(body: bytes) -> int:
+    """Messages in a JSON-RPC body; only batches are parsed"""
+    if body.lstrip()[:1] != b"[":
+        return 1
+    try:
+        messages = json.loads(body)
+    except ValueError:
+        return 1
+    return max(len(messages), 1) if isinstance(messages, list) else 1
+
+
+def _replay(body: bytes, receive):
+    """An ASGI receive that hands back an already read body, then defers to the real one"""
+    replayed = False
+
+    async def replay():
+        nonlocal replayed
+        if not replayed:
+            replayed = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        # Streaming responses keep listening for the client disconnecting
+        return await receive()
+
+    return replay
+
+
+class AdmissionMiddleware:
+    """ASGI middleware admitting tool requests; the slot is held until the response, including any stream, ends"""
+
+    def __init__(self, app, controller: Optional[AdmissionController] = None,
+                 paths: Tuple[str, ...] = ADMITTED_PATHS):
+        self.app = app
+        self.controller = controller or AdmissionController()
+        self.paths = paths
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            return await self.app(scope, receive, send)
+
+        cost = 1
+        session = None
+        if scope["method"] == "POST":
+            # Read the body up front so a batch is charged one token per message
+            chunks = []
+            while True:
+                message = await receive()
+                if message["type"] != "http.request":
+                    return
+                chunks.append(message.get("body", b""))
+                if not message.get("more_body"):
+                    break
+            body = b"".join(chunks)
+            cost = message_count(body)
+            if is_initialize(body):
+                session = mint_session()
+            receive = _replay(body, receive)
+
+        # Batch messages run concurrently, so each one holds an execution slot
+        slots = self.controller.slots(cost)
+        try:
+            # A session never gets more than its address: both buckets are charged,
+            # so opening extra sessions cannot raise a client's limit
+            self.controller.check_rate(client_key(scope), cost)
+            session_bucket = session_key(scope)
+            if session_bucket is not None:
+                self.controller.check_rate(session_bucket, cost)
+            await self.controller.acquire(slots)
+        except Rejected as rejected:
+            headers = {}
+            if rejected.retry_after:
+                headers["Retry-After"] = str(max(1, math.ceil(rejected.retry_after)))
+            response = FastJSONResponse(rpc_error(None, rejected.code, str(rejected)),
+                                        status_code=rejected.status, headers=headers)
+            return await response(scope, receive, send)
+
+        if session is not None:
+            # Hold the response start until its body shows whether initialize succeeded;
+            # a failed initialize must not hand out a session id
+            start = None
+
+            async def send_session(message):
+                nonlocal start
+                if message["type"] == "http.response.start":
+                    start = message
+                    return
+                if start is not None:
+                    held, start = start, None
+                    if held["status"] == 200 and is_result(message.get("body", b"")):
+                        held = dict(held, headers=list(held.get("headers") or [])
+                                    + [(b"mcp-session-id", session.encode())])
+                    await send(held)
+                await send(message)
+        else:
+            send_session = send
+
+        try:
+            await self.app(scope, receive, send_session)
+        finally:
+            self.controller.release(slots)
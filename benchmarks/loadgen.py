@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Concurrent load generator for the Wild Kratts MCP servers
+
+Keeps a fixed number of clients busy for a set duration, each issuing a
+weighted mix of tool calls (over /mcp JSON-RPC, or the REST endpoints for
+variants without /mcp), and reports throughput and p50/p95/p99 latency per
+scenario.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import Any, Dict, List, Tuple
+
+import httpx
+
+SEARCH_TERMS = ["plush", "book", "lion", "game", "orca", "puzzle", "wolf", "costume", "pan", "red fox"]
+
+# Relative weight of each scenario in the request mix
+SCENARIOS = {
+    "episodes_by_season": 3,
+    "products_search": 4,
+    "products_browse": 2,
+    "tools_list": 1,
+}
+
+
+def build_request(scenario: str, rng: random.Random) -> Tuple[Dict[str, Any], str, Dict[str, Any]]:
+    """Return (JSON-RPC message, REST path, REST params) for one request of a scenario"""
+    if scenario == "episodes_by_season":
+        season = rng.randint(1, 4)
+        return (
+            {"method": "tools/call", "params": {"name": "get_wild_kratts_episodes",
+                                                "arguments": {"seasonNumber": season}}},
+            "/episodes", {"seasonNumber": season}
+        )
+    if scenario == "products_search":
+        term = rng.choice(SEARCH_TERMS)
+        return (
+            {"method": "tools/call", "params": {"name": "get_wild_kratts_products",
+                                                "arguments": {"searchTerm": term}}},
+            "/products", {"searchTerm": term}
+        )
+    if scenario == "products_browse":
+        page = rng.randint(1, 5)
+        return (
+            {"method": "tools/call", "params": {"name": "get_wild_kratts_products",
+                                                "arguments": {"page": page}}},
+            "/products", {"page": page}
+        )
+    return {"method": "tools/list", "params": {}}, "/tools", {}
+
+
+def is_error(response: httpx.Response, rest: bool) -> bool:
+    """True for HTTP failures, JSON-RPC errors and tool results reporting an error"""
+    if response.status_code != 200:
+        return True
+    body = response.json()
+    if rest:
+        return isinstance(body, dict) and "error" in body
+    if "error" in body:
+        return True
+    for content in (body.get("result") or {}).get("content") or []:
+        # Tools report failures as {"error": ...} text content
+        if content.get("text", "").startswith('{"error"'):
+            return True
+    return False
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, min(len(sorted_values), round(fraction * len(sorted_values) + 0.5)))
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> Dict[str, Any]:
+    ordered = sorted(latencies)
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "throughput": len(ordered) / elapsed if elapsed else 0.0,
+        "mean_ms": 1000 * sum(ordered) / len(ordered) if ordered else 0.0,
+        "p50_ms": 1000 * percentile(ordered, 0.50),
+        "p95_ms": 1000 * percentile(ordered, 0.95),
+        "p99_ms": 1000 * percentile(ordered, 0.99),
+    }
+
+
+async def run_load(url: str, concurrency: int = 32, duration: float = 15.0, rest: bool = False,
+                   scenarios: Dict[str, int] = None, seed: int = 1) -> Dict[str, Any]:
+    """Drive the server at url and return overall and per-scenario latency summaries"""
+    scenarios = scenarios or SCENARIOS
+    names = list(scenarios)
+    weights = [scenarios[name] for name in names]
+    latencies: Dict[str, List[float]] = {name: [] for name in names}
+    errors: Dict[str, int] = {name: 0 for name in names}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as client:
+        deadline = time.perf_counter() + duration
+
+        async def worker(worker_id: int):
+            rng = random.Random(seed * 1000 + worker_id)
+            request_id = 0
+            while time.perf_counter() < deadline:
+                scenario = rng.choices(names, weights)[0]
+                message, path, params = build_request(scenario, rng)
+                request_id += 1
+                started = time.perf_counter()
+                try:
+                    if rest:
+                        response = await client.get(path, params=params)
+                    else:
+                        response = await client.post("/mcp", json=dict(message, jsonrpc="2.0", id=request_id))
+                    failed = is_error(response, rest)
+                except (httpx.HTTPError, ValueError):
+                    failed = True
+                latencies[scenario].append(time.perf_counter() - started)
+                if failed:
+                    errors[scenario] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(worker_id) for worker_id in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    every_latency = [latency for values in latencies.values() for latency in values]
+    return {
+        "concurrency": concurrency,
+        "duration": elapsed,
+        "overall": summarize(every_latency, sum(errors.values()), elapsed),
+        "scenarios": {name: summarize(latencies[name], errors[name], elapsed) for name in names},
+    }
+
+
+def format_report(title: str, result: Dict[str, Any]) -> str:
+    lines = [
+        f"{title}  (concurrency {result['concurrency']}, {result['duration']:.1f}s)",
+        f"  {'scenario':<20} {'reqs':>7} {'errs':>5} {'req/s':>8} {'mean':>8} {'p50':>8} {'p95':>8} {'p99':>8}",
+    ]
+    rows = list(result["scenarios"].items()) + [("overall", result["overall"])]
+    for name, stats in rows:
+        lines.append(
+            f"  {name:<20} {stats['requests']:>7} {stats['errors']:>5} {stats['throughput']:>8.1f} "
+            f"{stats['mean_ms']:>8.1f} {stats['p50_ms']:>8.1f} {stats['p95_ms']:>8.1f} {stats['p99_ms']:>8.1f}"
+        )
+    lines.append("  (latencies in ms)")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test a running Wild Kratts MCP server")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=15.0, help="Seconds of load (default: %(default)s)")
+    parser.add_argument("--rest", action="store_true", help="Use the REST endpoints instead of /mcp")
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    result = asyncio.run(run_load(args.url, args.concurrency, args.duration, args.rest))
+    print(format_report(args.url, result))
+    if args.json:
+        with open(args.json, "w") as output:
+            json.dump(result, output, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Benchmark every server variant against the local stub upstream
+
+Starts benchmarks/stub_upstream.py, then starts each server variant in turn
+(cold, with an empty snapshot directory) pointed at the stub. After a warm-up
+that waits for both catalogs to load, it runs the load generator against the
+variant and prints throughput and p50/p95/p99 latency for each.
+
+    python benchmarks/run.py --products 2000 --latency-ms 80 --duration 20
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+import httpx
+
+from loadgen import format_report, run_load
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+
+# Variant script -> whether it serves /mcp (otherwise the REST endpoints are benchmarked)
+VARIANTS = {
+    "server.py": True,
+    "server_http.py": True,
+    "server_railway.py": True,
+    "server_railway_simple.py": False,
+}
+
+
+async def wait_until_ready(url: str, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(timeout=5) as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get(url)).status_code < 500:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.1)
+    raise RuntimeError(f"{url} did not come up within {timeout:.0f}s")
+
+
+async def warm_up(url: str, mcp: bool) -> float:
+    """Issue one episode and one product call, which wait for both catalogs to load"""
+    started = time.perf_counter()
+    async with httpx.AsyncClient(base_url=url, timeout=120) as client:
+        if mcp:
+            for name, arguments in (("get_wild_kratts_episodes", {"seasonNumber": 1}),
+                                    ("get_wild_kratts_products", {"searchTerm": "plush"})):
+                await client.post("/mcp", json={"jsonrpc": "2.0", "id": 1, "method": "tools/call",
+                                                "params": {"name": name, "arguments": arguments}})
+        else:
+            await client.get("/episodes", params={"seasonNumber": 1})
+            await client.get("/products", params={"searchTerm": "plush"})
+    return time.perf_counter() - started
+
+
+def start(args: List[str], env: Dict[str, str]) -> subprocess.Popen:
+    return subprocess.Popen([sys.executable] + args, cwd=REPO_DIR, env=dict(os.environ, **env),
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def stop(process: subprocess.Popen):
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+async def benchmark_variant(variant: str, args, upstream_base: str, port: int) -> Dict[str, Any]:
+    mcp = VARIANTS.get(variant, True)
+    url = f"http://127.0.0.1:{port}"
+    with tempfile.TemporaryDirectory() as snapshot_dir:
+        server = start([variant], {
+            "PORT": str(port),
+            "WILDKRATTS_API_BASE": upstream_base,
+            "CATALOG_SNAPSHOT_DIR": snapshot_dir,
+            # Every load generator client shares one IP; measure the server, not the per-client rate limit
+            "ADMISSION_RATE": "0",
+        })
+        try:
+            await wait_until_ready(f"{url}/health")
+            warm_up_seconds = await warm_up(url, mcp)
+            result = await run_load(url, args.concurrency, args.duration, rest=not mcp, seed=args.seed)
+        finally:
+            stop(server)
+    result["variant"] = variant
+    result["transport"] = "mcp" if mcp else "rest"
+    result["warm_up_seconds"] = warm_up_seconds
+    return result
+
+
+async def run(args) -> List[Dict[str, Any]]:
+    upstream = start([os.path.join(BENCH_DIR, "stub_upstream.py"),
+                      "--port", str(args.upstream_port),
+                      "--episodes", str(args.episodes), "--products", str(args.products),
+                      "--latency-ms", str(args.latency_ms), "--jitter-ms", str(args.jitter_ms)], {})
+    upstream_base = f"http://127.0.0.1:{args.upstream_port}/wp-json"
+    results = []
+    try:
+        await wait_until_ready(f"{upstream_base}/wild-kratts/v1/episodes")
+        for variant in args.variants:
+            result = await benchmark_variant(variant, args, upstream_base, args.port)
+            print(format_report(f"{variant} [{result['transport']}], warm-up {result['warm_up_seconds']:.2f}s",
+                                result), flush=True)
+            print(flush=True)
+            results.append(result)
+    finally:
+        stop(upstream)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Wild Kratts server variants against a stub upstream")
+    parser.add_argument("--variants", nargs="+", default=list(VARIANTS), help="Server scripts to benchmark")
+    parser.add_argument("--episodes", type=int, default=160, help="Synthetic episodes (default: %(default)s)")
+    parser.add_argument("--products", type=int, default=500, help="Synthetic products (default: %(default)s)")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Upstream latency (default: %(default)s)")
+    parser.add_argument("--jitter-ms", type=float, default=10.0, help="Upstream latency jitter (default: %(default)s)")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=15.0, help="Seconds of load per variant (default: %(default)s)")
+    parser.add_argument("--port", type=int, default=8901, help="Port for the server under test")
+    parser.add_argument("--upstream-port", type=int, default=8900, help="Port for the stub upstream")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="Also write all results to this file (e.g. to compare before/after)")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+
+    print(f"{'variant':<28} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'errors':>7}")
+    for result in results:
+        overall = result["overall"]
+        print(f"{result['variant']:<28} {overall['throughput']:>8.1f} {overall['p50_ms']:>8.1f} "
+              f"{overall['p95_ms']:>8.1f} {overall['p99_ms']:>8.1f} {overall['errors']:>7}")
+
+    if args.json:
+        with open(args.json, "w") as output:
+            json.dump(results, output, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Local stub of the Wild Kratts WordPress REST API for benchmarking
+
+Serves synthetic, deterministic episode and product catalogs of configurable
+size with configurable response latency. It implements the parts of the real
+API the servers rely on: per_page/page paging with X-WP-Total /
+X-WP-TotalPages headers, the _fields projection, and ETag revalidation.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+from typing import Any, Dict, List
+
+import uvicorn
+from fastapi import FastAPI, Request, Response
+
+ANIMALS = [
+    "Lion", "Zebra", "Cheetah", "Orca", "Bald Eagle", "Spider Monkey", "Giant Panda", "Red Fox",
+    "Honey Badger", "Sea Turtle", "Octopus", "Platypus", "Komodo Dragon", "Gray Wolf", "Koala",
+    "Hummingbird", "Tarantula", "Polar Bear", "Bison", "Armadillo", "Chameleon", "Flying Squirrel",
+]
+PRODUCT_KINDS = ["plush", "book", "game", "puzzle", "dvd", "costume", "toy", "app", "sticker", "poster"]
+CATEGORIES = ["Play", "Read", "Watch", "Wear", "Learn"]
+RETAILERS = ["Amazon", "Target", "Walmart", "PBS Kids Shop", "Barnes & Noble"]
+
+
+def make_episodes(count: int, seed: int = 1) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    episodes = []
+    for number in range(1, count + 1):
+        season = 1 + (number - 1) // 40
+        animals = rng.sample(ANIMALS, 3)
+        episodes.append({
+            "Season": season,
+            "Episode Number (Broadcast Order)": number,
+            "Episode Number (Internal)": number,
+            "Episode Title": f"{animals[0]} {rng.choice(['Adventure', 'Rescue', 'Mystery', 'Race', 'Escape'])}",
+            "Air Date": f"{2010 + season}-{1 + number % 12:02d}-{1 + number % 28:02d}",
+            "imagePath": f"/images/episodes/{number}.jpg",
+            "Summary": f"The Kratt brothers discover the {animals[0]}. " * 8,
+            "Animals Featured": animals,
+            "Creature Powers": [f"{animals[0]} Power"],
+            "Locations": [rng.choice(["Africa", "Amazon", "Arctic", "Australia", "Asia"])],
+            "streamingUrls": {"pbs": f"https://pbskids.org/wildkratts/{number}"},
+        })
+    return episodes
+
+
+def make_products(count: int, seed: int = 2) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    products = []
+    for product_id in range(1, count + 1):
+        animal = rng.choice(ANIMALS)
+        kind = rng.choice(PRODUCT_KINDS)
+        products.append({
+            "id": product_id,
+            "date": "2024-01-01T00:00:00",
+            "slug": f"{animal}-{kind}-{product_id}".lower().replace(" ", "-"),
+            "status": "publish",
+            "type": "products",
+            "link": f"https://wildkratts.com/products/{product_id}",
+            "title": {"rendered": f"Wild Kratts {animal} {kind.title()}"},
+            "content": {"rendered": "<p>" + "Lorem ipsum dolor sit amet. " * 20 + "</p>"},
+            "description": f"<p>A <b>{animal}</b> {kind} for creature adventurers.</p>",
+            "featured_image": f"https://wildkratts.com/images/products/{product_id}.jpg",
+            "product_categories": rng.sample(CATEGORIES, rng.randint(1, 2)),
+            "retailers": [{"name": name, "url": f"https://example.com/{product_id}"}
+                          for name in rng.sample(RETAILERS, 2)],
+            "yoast_head": "<meta>" * 40,
+            "_links": {"self": [{"href": f"https://wildkratts.com/wp-json/wp/v2/products/{product_id}"}]},
+        })
+    return products
+
+
+def create_app(episodes: int = 160, products: int = 500, latency_ms: float = 50.0,
+               jitter_ms: float = 10.0, seed: int = 1) -> FastAPI:
+    app = FastAPI(title="Wild Kratts upstream stub")
+    episode_catalog = make_episodes(episodes, seed)
+    product_catalog = make_products(products, seed + 1)
+    rng = random.Random(seed)
+
+    async def delay():
+        if latency_ms or jitter_ms:
+            await asyncio.sleep(max(0.0, latency_ms + rng.uniform(-jitter_ms, jitter_ms)) / 1000)
+
+    def respond(request: Request, payload: Any, headers: Dict[str, str] = None) -> Response:
+        body = json.dumps(payload).encode()
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        headers = dict(headers or {}, ETag=etag)
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers=headers)
+        return Response(body, media_type="application/json", headers=headers)
+
+    @app.get("/wp-json/wild-kratts/v1/episodes")
+    async def get_episodes(request: Request):
+        await delay()
+        return respond(request, episode_catalog)
+
+    @app.get("/wp-json/wp/v2/products")
+    async def get_products(request: Request, per_page: int = 10, page: int = 1, _fields: str = None):
+        await delay()
+        per_page = max(1, min(per_page, 100))
+        total_pages = max(1, (len(product_catalog) + per_page - 1) // per_page)
+        if page < 1 or page > total_pages:
+            return Response(json.dumps({"code": "rest_post_invalid_page_number"}), status_code=400,
+                            media_type="application/json")
+        items = product_catalog[(page - 1) * per_page:page * per_page]
+        if _fields:
+            keep = _fields.split(",")
+            items = [{key: item[key] for key in keep if key in item} for item in items]
+        return respond(request, items, {
+            "X-WP-Total": str(len(product_catalog)),
+            "X-WP-TotalPages": str(total_pages),
+        })
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a synthetic Wild Kratts WordPress API")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--episodes", type=int, default=160, help="Episodes in the catalog (default: %(default)s)")
+    parser.add_argument("--products", type=int, default=500, help="Products in the catalog (default: %(default)s)")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Mean response latency (default: %(default)s)")
+    parser.add_argument("--jitter-ms", type=float, default=10.0, help="Uniform latency jitter (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    app = create_app(args.episodes, args.products, args.latency_ms, args.jitter_ms, args.seed)
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,402 @@
+"""
+Process-level caches of the Wild Kratts upstream catalogs
+"""
+
+import asyncio
+import logging
+import os
+import time
+from abc import ABC, abstractmethod
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from cursor import ResultPager
+from episode_index import EpisodeIndex
+from metrics import cache_result
+from product_index import PRODUCT_FIELDS, ProductIndex
+from progress import ProgressChannel, report_progress
+from snapshot import (acquire_refresh_lease, read_snapshot, refresh_lease_active, release_refresh_lease,
+                      snapshot_stamp, snapshot_synced_at, write_snapshot)
+from upstream import UpstreamUnavailable, upstream
+
+logger = logging.getLogger(__name__)
+
+# Episode data changes roughly weekly, so an hour-old list is fine to serve
+EPISODE_CACHE_TTL = float(os.environ.get("EPISODE_CACHE_TTL", "3600"))
+
+# The product catalog is crawled in full to build the local search index
+PRODUCT_CACHE_TTL = float(os.environ.get("PRODUCT_CACHE_TTL", "3600"))
+
+# How often a catalog checks the snapshot for newer data and whether it has gone stale
+SNAPSHOT_CHECK_INTERVAL = float(os.environ.get("CATALOG_SNAPSHOT_CHECK_INTERVAL", "60"))
+
+# Product pages fetched at once while crawling the catalog
+PRODUCT_CRAWL_CONCURRENCY = int(os.environ.get("PRODUCT_CRAWL_CONCURRENCY", "4"))
+
+# Catalog crawls allowed against upstream at once across every catalog in the process
+MAX_CONCURRENT_CRAWLS = int(os.environ.get("MAX_CONCURRENT_CRAWLS", "1"))
+_crawl_slots = asyncio.Semaphore(max(MAX_CONCURRENT_CRAWLS, 1))
+
+# Seconds one process may hold a catalog's refresh lease before the others assume it died
+REFRESH_LEASE_TTL = float(os.environ.get("CATALOG_REFRESH_LEASE", "300"))
+LEASE_POLL_INTERVAL = 0.5
+
+
+class IncompleteCrawl(Exception):
+    """A crawl that stopped before its last page, carrying the items fetched so far"""
+
+    def __init__(self, message: str, items: List[Dict[str, Any]]):
+        super().__init__(message)
+        self.items = items
+
+
+async def iter_product_pages(products_api: str, per_page: int = 100,
+                             concurrency: int = PRODUCT_CRAWL_CONCURRENCY,
+                             fields: Optional[Tuple[str, ...]] = None
+                             ) -> AsyncIterator[Tuple[int, int, List[Dict[str, Any]], bool]]:
+    """Yield (page, total_pages, products, revalidated) in page order.
+
+    Page 1 discovers the page count; the remaining pages are fetched
+    concurrently under a semaphore. Closing the generator early (e.g. once a
+    search has enough matches) cancels every page not yet fetched. With
+    fields, upstream only returns those keys (WP REST _fields). A later page
+    that still fails after retries ends the iteration early, so callers must
+    compare the last page yielded with total_pages.
+    """
+    query = f"per_page={per_page}"
+    if fields:
+        query += "&_fields=" + ",".join(fields)
+    response = await upstream.fetch_json(f"{products_api}?{query}&page=1", route="products")
+
+    if not response.is_success:
+        raise Exception(f"API request failed with status {response.status_code}")
+
+    total_pages = int(response.headers.get('X-WP-TotalPages', '1'))
+    products = response.data
+    if not products:
+        return
+    report_progress(1, total_pages, f"Fetched product page 1 of {total_pages}", products)
+    yield 1, total_pages, products, response.revalidated
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch_page(page: int):
+        async with semaphore:
+            return await upstream.fetch_json(f"{products_api}?{query}&page={page}", route="products")
+
+    tasks = [asyncio.create_task(fetch_page(page)) for page in range(2, total_pages + 1)]
+    try:
+        for page, task in enumerate(tasks, start=2):
+            try:
+                response = await task
+            except (httpx.HTTPError, UpstreamUnavailable, ValueError) as error:
+                # ValueError covers a body that is not valid JSON (e.g. a truncated response)
+                logger.warning("Product page %d of %d failed: %s", page, total_pages, error)
+                break
+
+            # A failed or empty later page ends the crawl with what we have so far
+            if not response.is_success:
+                logger.warning("Product page %d of %d failed with status %d", page, total_pages,
+                               response.status_code)
+                break
+            products = response.data
+            if not products:
+                break
+            report_progress(page, total_pages, f"Fetched product page {page} of {total_pages}", products)
+            yield page, total_pages, products, response.revalidated
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+            elif not task.cancelled():
+                task.exception()
+
+
+class CachedCatalog(ABC):
+    """Cached upstream catalog backed by the persistent on-disk snapshot.
+
+    At startup the snapshot is loaded straight from disk so the first tool
+    call never waits on upstream. While the snapshot is younger than the TTL
+    (e.g. because the sync worker keeps it fresh) upstream is never called.
+    Once it goes stale, stale data keeps being served while one background
+    task re-fetches from upstream and writes the result back to the snapshot.
+    Processes sharing the snapshot (e.g. pre-forked workers) take a refresh
+    lease first, so only one of them crawls and the rest load its snapshot.
+    flags() reports when what is served is incomplete or could not be refreshed.
+    """
+
+    name = "catalog"
+    snapshot_name: str = None
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.items: Optional[List[Dict[str, Any]]] = None
+        self.index: Any = None
+        self.synced_at = 0.0
+        # Sync time of the snapshot the current items came from; cursors are tied to it
+        self.version = 0.0
+        self.checked_at = 0.0
+        # Why the served items are incomplete, and why the last refresh failed
+        self.partial: Optional[str] = None
+        self.refresh_error: Optional[str] = None
+        self._pager = ResultPager()
+        self._lock = asyncio.Lock()
+        self._refresh_task: Optional[asyncio.Task] = None
+        # Requests blocked on the first load get the crawl's progress; warm requests never do
+        self._progress = ProgressChannel()
+
+    @property
+    def is_stale(self) -> bool:
+        return time.time() - self.synced_at >= self.ttl
+
+    @property
+    def needs_check(self) -> bool:
+        return time.monotonic() - self.checked_at >= SNAPSHOT_CHECK_INTERVAL
+
+    def flags(self) -> Dict[str, Any]:
+        """Flags to merge into tool results when the served catalog is partial or stale"""
+        if self.partial:
+            return {'partial': True, 'warning': self.partial}
+        if self.refresh_error and self.is_stale:
+            age = (time.time() - self.synced_at) / 60
+            return {'stale': True,
+                    'warning': f"{self.name} data is {age:.0f} minutes old; refreshing it failed: {self.refresh_error}"}
+        return {}
+
+    async def get(self) -> List[Dict[str, Any]]:
+        """Return the catalog items, only waiting on upstream for the very first load"""
+        await self._ensure_loaded()
+        return self.items
+
+    async def get_index(self) -> Any:
+        """Return the query index built for the current items"""
+        await self._ensure_loaded()
+        return self.index
+
+    async def paginate(self, query: Dict[str, Any], run: Callable[[Any, Dict[str, Any]], List[Any]],
+                       cursor: str = None, page: int = 1, per_page: int = 100
+                       ) -> Tuple[List[Any], Dict[str, Any]]:
+        """Return one page of run(index, query) and a pagination block with an opaque nextCursor"""
+        await self._ensure_loaded()
+        return self._pager.page(self.version, self.index, query, run, cursor, page, per_page)
+
+    async def preload(self):
+        """Load the snapshot at startup and start a background refresh if it is missing or stale"""
+        try:
+            await self.load_snapshot()
+        except Exception as error:
+            logger.warning("Could not read %s snapshot: %s", self.snapshot_name, error)
+        self.checked_at = time.monotonic()
+        if self.items is None or self.is_stale:
+            self._refresh_task = asyncio.create_task(self._refresh())
+
+    async def _ensure_loaded(self):
+        cache_result(f"{self.snapshot_name}_catalog", self.items is not None)
+        if self.items is None:
+            # Concurrent first callers share a single load, and its progress
+            with self._progress.waiting():
+                async with self._lock:
+                    if self.items is None and not await self.load_snapshot():
+                        await self._refresh_from_upstream()
+                    self.checked_at = time.monotonic()
+        elif self.needs_check and (self._refresh_task is None or self._refresh_task.done()):
+            self._refresh_task = asyncio.create_task(self._refresh())
+
+    @abstractmethod
+    async def fetch(self) -> List[Dict[str, Any]]:
+        """Download the full catalog from upstream"""
+
+    @abstractmethod
+    def build_index(self, items: List[Dict[str, Any]]) -> Any:
+        """Build the query index for a freshly loaded catalog"""
+
+    def preload_snapshot(self) -> bool:
+        """Load the snapshot synchronously, before any event loop exists (e.g. in a pre-fork parent)"""
+        snapshot = read_snapshot(self.snapshot_name)
+        if snapshot is None:
+            return False
+        self._publish(snapshot["items"], snapshot["version"])
+        self.synced_at = snapshot["synced_at"]
+        return True
+
+    async def load_snapshot(self) -> bool:
+        """Publish the on-disk snapshot if it is newer than what is being served"""
+        stamp = await asyncio.to_thread(snapshot_stamp, self.snapshot_name)
+        if stamp is None:
+            return False
+        synced_at, version = stamp
+        if version == self.version and self.items is not None and not self.partial:
+            # Re-synced without changes: same content, so keep the items, index and cursors
+            self.synced_at = synced_at
+        elif synced_at != self.synced_at or self.items is None:
+            snapshot = await asyncio.to_thread(read_snapshot, self.snapshot_name)
+            if snapshot is None:
+                return False
+            self._publish(snapshot["items"], snapshot["version"])
+            self.synced_at = snapshot["synced_at"]
+        return True
+
+    async def _refresh_from_upstream(self) -> bool:
+        """Crawl under the refresh lease; False if another process's crawl was used instead"""
+        try:
+            leased = await asyncio.to_thread(acquire_refresh_lease, self.snapshot_name, REFRESH_LEASE_TTL)
+        except Exception as error:
+            # An unwritable snapshot directory must not stop the catalog from loading
+            logger.warning("Could not take the %s refresh lease: %s", self.snapshot_name, error)
+            await self._crawl()
+            return True
+
+        if not leased:
+            # Another process sharing the snapshot is crawling; use its result instead of crawling too
+            if self.items is not None or await self._wait_for_snapshot():
+                return False
+            # The holder gave up without writing a snapshot
+            await self._crawl()
+            return True
+
+        try:
+            await self._crawl()
+            return True
+        finally:
+            try:
+                await asyncio.to_thread(release_refresh_lease, self.snapshot_name)
+            except Exception as error:
+                logger.warning("Could not release the %s refresh lease: %s", self.snapshot_name, error)
+
+    async def sync(self) -> bool:
+        """Re-crawl upstream into the snapshot now, under the same refresh lease as a stale refresh
+
+        Used by the sync worker. Returns False, without crawling, if another
+        process sharing the snapshot holds the lease. Raises if the crawl was
+        incomplete or the snapshot could not be written.
+        """
+        async with self._lock:
+            await self.load_snapshot()
+            if not await self._refresh_from_upstream():
+                return False
+        if self.partial:
+            raise RuntimeError(self.partial)
+        if await asyncio.to_thread(snapshot_synced_at, self.snapshot_name) != self.synced_at:
+            raise RuntimeError(f"could not write the {self.snapshot_name} snapshot")
+        return True
+
+    async def _wait_for_snapshot(self) -> bool:
+        """Wait while another process holds the refresh lease; True once its snapshot is loaded"""
+        while True:
+            if await self.load_snapshot():
+                return True
+            if not await asyncio.to_thread(refresh_lease_active, self.snapshot_name):
+                return await self.load_snapshot()
+            await asyncio.sleep(LEASE_POLL_INTERVAL)
+
+    async def _crawl(self):
+        try:
+            async with _crawl_slots:
+                with self._progress.reporting():
+                    items = await self.fetch()
+        except IncompleteCrawl as crawl:
+            if self.items is not None and not self.partial:
+                # Never replace a complete catalog with a truncated one
+                raise
+            # Nothing complete to serve: publish what was crawled, flagged, and retry at the next check
+            self._publish(crawl.items, time.time())
+            self.partial = f"{self.name} catalog is incomplete: {crawl}"
+            return
+        synced_at = time.time()
+        # fetch() hands back the items already served when upstream says nothing changed; a full
+        # re-crawl of identical data keeps the version too, so open cursors stay valid everywhere
+        if self.partial or self.items is None or (items is not self.items and items != self.items):
+            self._publish(items, synced_at)
+        self.synced_at = synced_at
+        try:
+            await asyncio.to_thread(write_snapshot, self.snapshot_name, self.items, self.synced_at, self.version)
+        except Exception as error:
+            logger.warning("Could not write %s snapshot: %s", self.snapshot_name, error)
+
+    def _publish(self, items: List[Dict[str, Any]], version: float):
+        # Build the index before publishing so readers never see a mismatched pair
+        self.index = self.build_index(items)
+        self.items = items
+        self.version = version
+        self.partial = None
+
+    async def _refresh(self):
+        self.checked_at = time.monotonic()
+        try:
+            async with self._lock:
+                # Pick up anything the worker (or another process) wrote first
+                await self.load_snapshot()
+                if self.items is None or self.is_stale or self.partial:
+                    await self._refresh_from_upstream()
+            self.refresh_error = None
+        except Exception as error:
+            # Keep serving the stale catalog; retried after the next check interval
+            logger.warning("%s catalog refresh failed: %s", self.name, error)
+            self.refresh_error = str(error) or type(error).__name__
+
+    async def close(self):
+        """Cancel any background refresh still in flight"""
+        if self._refresh_task is not None and not self._refresh_task.done():
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+        self._refresh_task = None
+
+
+class EpisodeCatalog(CachedCatalog):
+    """Cached episode list with its query index"""
+
+    name = "Episode"
+    snapshot_name = "episodes"
+
+    def __init__(self, url: str, ttl: float = EPISODE_CACHE_TTL):
+        super().__init__(ttl)
+        self.url = url
+
+    async def fetch(self) -> List[Dict[str, Any]]:
+        response = await upstream.fetch_json(self.url, route="episodes")
+
+        if not response.is_success:
+            raise Exception(f"API request failed with status {response.status_code}")
+
+        if response.revalidated and self.items is not None:
+            return self.items
+        return response.data or []
+
+    def build_index(self, items: List[Dict[str, Any]]) -> EpisodeIndex:
+        return EpisodeIndex(items)
+
+
+class ProductCatalog(CachedCatalog):
+    """Cached full product catalog with its full-text search index"""
+
+    name = "Product"
+    snapshot_name = "products"
+
+    def __init__(self, url: str, ttl: float = PRODUCT_CACHE_TTL, per_page: int = 100):
+        super().__init__(ttl)
+        self.url = url
+        self.per_page = per_page
+
+    async def fetch(self) -> List[Dict[str, Any]]:
+        products = []
+        last_page = total_pages = 0
+        revalidated = True
+        # Only download the fields the tools and the search index use
+        async with aclosing(iter_product_pages(self.url, self.per_page, fields=PRODUCT_FIELDS)) as pages:
+            async for last_page, total_pages, page_products, page_revalidated in pages:
+                products.extend(page_products)
+                revalidated = revalidated and page_revalidated
+
+        if last_page < total_pages:
+            raise IncompleteCrawl(f"crawl stopped at page {last_page} of {total_pages}", products)
+        if revalidated and self.items is not None and len(products) == len(self.items):
+            return self.items
+        return products
+
+    def build_index(self, items: List[Dict[str, Any]]) -> ProductIndex:
+        return ProductIndex(items)
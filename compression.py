@@ -0,0 +1,181 @@
+"""
+Response compression negotiated from Accept-Encoding (zstd, brotli and gzip)
+"""
+
+import asyncio
+import gzip
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+from metrics import COMPRESSION_BYTES, COMPRESSION_DURATION
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional
+    zstandard = None
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; brotlicffi has the same API
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+# Set COMPRESSION=0 to always answer uncompressed
+ENABLED = os.environ.get("COMPRESSION", "1") == "1"
+
+# Smaller bodies gain little and cost CPU on every request
+MIN_SIZE = int(os.environ.get("COMPRESSION_MIN_SIZE", "1024"))
+
+# Larger bodies are compressed off the event loop (the codecs release the GIL)
+THREAD_SIZE = int(os.environ.get("COMPRESSION_THREAD_SIZE", "262144"))
+
+# Levels favour speed: responses are compressed per request
+GZIP_LEVEL = int(os.environ.get("COMPRESSION_GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.environ.get("COMPRESSION_BROTLI_QUALITY", "4"))
+ZSTD_LEVEL = int(os.environ.get("COMPRESSION_ZSTD_LEVEL", "3"))
+
+# Only JSON and text bodies are compressed; SSE streams are left alone so events are not held back
+COMPRESSIBLE_TYPES = ("application/json", "text/plain", "text/html")
+
+
+def available_encodings() -> List[str]:
+    """Encodings this process can produce, most preferred first"""
+    encodings = []
+    if zstandard is not None:
+        encodings.append("zstd")
+    if brotli is not None:
+        encodings.append("br")
+    encodings.append("gzip")
+    return encodings
+
+
+AVAILABLE = available_encodings()
+
+
+def _parse_accept_encoding(header: str) -> Dict[str, float]:
+    weights = {}
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        weights[name] = quality
+    return weights
+
+
+def negotiate(accept_encoding: Optional[str]) -> Optional[str]:
+    """Pick the encoding to use for a request's Accept-Encoding, or None for identity"""
+    if not ENABLED or not accept_encoding:
+        return None
+    weights = _parse_accept_encoding(accept_encoding)
+    best, best_quality = None, 0.0
+    for encoding in AVAILABLE:
+        quality = weights.get(encoding, weights.get("*", 0.0))
+        # Ties go to the encoding earlier in AVAILABLE (better ratio for JSON)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    started = time.perf_counter()
+    if encoding == "zstd":
+        compressed = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body)
+    elif encoding == "br":
+        compressed = brotli.compress(body, quality=BROTLI_QUALITY)
+    elif encoding == "gzip":
+        compressed = gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    else:
+        raise ValueError(f"Unsupported encoding: {encoding}")
+    COMPRESSION_DURATION.observe(time.perf_counter() - started, encoding=encoding)
+    COMPRESSION_BYTES.inc(len(body), encoding=encoding, stage="raw")
+    COMPRESSION_BYTES.inc(len(compressed), encoding=encoding, stage="compressed")
+    return compressed
+
+
+def weak_etag(etag: str) -> str:
+    """Compressed variants share the identity ETag, so it can only be a weak validator"""
+    return etag if etag.startswith("W/") else "W/" + etag
+
+
+def _header(headers: List[Tuple[bytes, bytes]], name: bytes) -> Optional[bytes]:
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing complete JSON/text responses for clients that accept it.
+
+    Responses sent in a single body message are compressed once they reach
+    MIN_SIZE; streamed responses and bodies that already carry a
+    Content-Encoding (e.g. pre-compressed CachedJSON) pass through untouched.
+    """
+
+    def __init__(self, app, min_size: int = MIN_SIZE):
+        self.app = app
+        self.min_size = min_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        encoding = negotiate((_header(scope.get("headers") or [], b"accept-encoding") or b"").decode("latin-1"))
+        if encoding is None:
+            return await self.app(scope, receive, send)
+
+        start_message = None
+
+        async def send_wrapper(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                headers = message.get("headers") or []
+                content_type = (_header(headers, b"content-type") or b"").decode("latin-1")
+                if (_header(headers, b"content-encoding") is not None
+                        or not content_type.startswith(COMPRESSIBLE_TYPES)):
+                    await send(message)
+                    return
+                # Hold the start until the body shows whether it is worth compressing
+                start_message = message
+                return
+
+            if message["type"] != "http.response.body" or start_message is None:
+                await send(message)
+                return
+
+            start, start_message = start_message, None
+            body = message.get("body", b"")
+            if message.get("more_body") or len(body) < self.min_size:
+                await send(start)
+                await send(message)
+                return
+
+            if len(body) >= THREAD_SIZE:
+                body = await asyncio.to_thread(compress, body, encoding)
+            else:
+                body = compress(body, encoding)
+            original = start.get("headers") or []
+            headers = [(key, value) for key, value in original
+                       if key.lower() not in (b"content-length", b"etag", b"vary")]
+            etag = _header(original, b"etag")
+            if etag is not None:
+                headers.append((b"etag", weak_etag(etag.decode("latin-1")).encode("latin-1")))
+            vary = _header(original, b"vary")
+            headers += [(b"content-encoding", encoding.encode()),
+                        (b"vary", vary + b", Accept-Encoding" if vary else b"Accept-Encoding"),
+                        (b"content-length", str(len(body)).encode())]
+            await send(dict(start, headers=headers))
+            await send(dict(message, body=body))
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,92 @@
+"""
+Opaque pagination cursors tied to a catalog snapshot version
+"""
+
+import base64
+import binascii
+import json
+import os
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from fastjson import dumps
+from metrics import cache_result
+
+# Result lists kept per catalog so later pages neither re-run the query nor wait on upstream
+CURSOR_CACHE_SIZE = int(os.environ.get("CURSOR_CACHE_SIZE", "128"))
+
+
+class CursorError(ValueError):
+    """A cursor that is malformed or whose catalog snapshot is no longer available"""
+
+
+def encode_cursor(state: Dict[str, Any]) -> str:
+    return base64.urlsafe_b64encode(dumps(state)).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    try:
+        state = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, ValueError, TypeError):
+        raise CursorError("Invalid cursor")
+    if (not isinstance(state, dict) or not {"v", "q", "o", "n"} <= state.keys()
+            or not isinstance(state["q"], dict)
+            or not isinstance(state["o"], int) or state["o"] < 0
+            or not isinstance(state["n"], int) or state["n"] < 1):
+        raise CursorError("Invalid cursor")
+    return state
+
+
+class ResultPager:
+    """Pages through query results against one catalog version.
+
+    Each query's full result list is cached per snapshot version, so a cursor
+    keeps walking the exact results it started on, even across a catalog
+    refresh, for as long as they stay cached.
+    """
+
+    def __init__(self, size: int = CURSOR_CACHE_SIZE):
+        self.size = size
+        self._results: "OrderedDict[Tuple[float, str], List[Any]]" = OrderedDict()
+
+    def page(self, version: float, index: Any, query: Dict[str, Any],
+             run: Callable[[Any, Dict[str, Any]], List[Any]],
+             cursor: Optional[str] = None, page: int = 1, per_page: int = 100
+             ) -> Tuple[List[Any], Dict[str, Any]]:
+        """Return one page of results and its pagination block.
+
+        Without a cursor the query runs against index (the current catalog
+        version) and page selects the offset. With a cursor, its own query,
+        page size and snapshot version take over.
+        """
+        snapshot_version = version
+        per_page = max(per_page, 1)
+        offset = (max(page, 1) - 1) * per_page
+        if cursor:
+            state = decode_cursor(cursor)
+            snapshot_version, query, offset, per_page = state["v"], state["q"], state["o"], state["n"]
+
+        key = (snapshot_version, dumps(dict(sorted(query.items()))).decode())
+        results = self._results.get(key)
+        cache_result("cursor_results", results is not None)
+        if results is None:
+            if snapshot_version != version:
+                raise CursorError("Cursor expired: the catalog was refreshed, start again without a cursor")
+            results = run(index, query)
+            self._results[key] = results
+            while len(self._results) > self.size:
+                self._results.popitem(last=False)
+        else:
+            self._results.move_to_end(key)
+
+        end = offset + per_page
+        next_cursor = None
+        if end < len(results):
+            next_cursor = encode_cursor({"v": snapshot_version, "q": query, "o": end, "n": per_page})
+        return results[offset:end], {
+            'currentPage': offset // per_page + 1,
+            'totalItems': len(results),
+            'totalPages': (len(results) + per_page - 1) // per_page,
+            'itemsPerPage': per_page,
+            'nextCursor': next_cursor
+        }
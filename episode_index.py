@@ -0,0 +1,145 @@
+"""
+Precomputed indexes over the Wild Kratts episode catalog
+"""
+
+import re
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Set
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Formats seen in the upstream "Air Date" field; query bounds use the first one
+AIR_DATE_FORMATS = ("%Y-%m-%d", "%m/%d/%Y", "%B %d, %Y", "%b %d, %Y", "%Y-%m-%dT%H:%M:%S")
+
+
+def tokenize(text: str) -> List[str]:
+    """Split lowercased text into alphanumeric tokens"""
+    return TOKEN_RE.findall(text.lower())
+
+
+def parse_air_date(value: Any) -> Optional[date]:
+    """Parse an upstream air date, returning None when it is missing or unrecognised"""
+    if not isinstance(value, str) or not value.strip():
+        return None
+    for fmt in AIR_DATE_FORMATS:
+        try:
+            return datetime.strptime(value.strip(), fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def parse_int(value: Any) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class EpisodeIndex:
+    """Season, animal, title, air date and broadcast number indexes built once per catalog load"""
+
+    def __init__(self, episodes: List[Dict[str, Any]]):
+        self.episodes = episodes
+        self.season_map: Dict[Any, Set[int]] = {}
+        self.animal_map: Dict[str, Set[int]] = {}
+        self.title_token_map: Dict[str, Set[int]] = {}
+        self.titles_lower: List[str] = []
+
+        dated = []
+        numbered = []
+        for position, episode in enumerate(episodes):
+            self.season_map.setdefault(episode.get('Season'), set()).add(position)
+
+            animals = episode.get('Animals Featured', [])
+            if isinstance(animals, list):
+                for animal in animals:
+                    if isinstance(animal, str):
+                        self.animal_map.setdefault(animal.lower(), set()).add(position)
+
+            title_lower = (episode.get('Episode Title') or '').lower()
+            self.titles_lower.append(title_lower)
+            for token in set(tokenize(title_lower)):
+                self.title_token_map.setdefault(token, set()).add(position)
+
+            air_date = parse_air_date(episode.get('Air Date'))
+            if air_date is not None:
+                dated.append((air_date, position))
+
+            number = parse_int(episode.get('Episode Number (Broadcast Order)'))
+            if number is not None:
+                numbered.append((number, position))
+
+        # Sorted parallel arrays for bisect range queries
+        dated.sort()
+        numbered.sort()
+        self.air_dates = [value for value, _ in dated]
+        self.air_date_positions = [position for _, position in dated]
+        self.broadcast_numbers = [value for value, _ in numbered]
+        self.broadcast_positions = [position for _, position in numbered]
+
+        # Substring matches are resolved against the (small) vocabularies once per distinct term
+        self._animal_matches = lru_cache(maxsize=1024)(self._match_animal)
+        self._title_matches = lru_cache(maxsize=1024)(self._match_title)
+
+    def _match_animal(self, term: str) -> FrozenSet[int]:
+        positions: Set[int] = set()
+        for name, name_positions in self.animal_map.items():
+            if term in name:
+                positions |= name_positions
+        return frozenset(positions)
+
+    def _match_title(self, term: str) -> FrozenSet[int]:
+        words = tokenize(term)
+        if not words:
+            return frozenset(i for i, title in enumerate(self.titles_lower) if term in title)
+
+        # Every word of the term sits inside one title token, so the longest word narrows the candidates
+        longest = max(words, key=len)
+        candidates: Set[int] = set()
+        for token, token_positions in self.title_token_map.items():
+            if longest in token:
+                candidates |= token_positions
+        return frozenset(i for i in candidates if term in self.titles_lower[i])
+
+    @staticmethod
+    def _range(keys: list, positions: List[int], low: Any, high: Any) -> Set[int]:
+        start = bisect_left(keys, low) if low is not None else 0
+        end = bisect_right(keys, high) if high is not None else len(keys)
+        return set(positions[start:end])
+
+    def query(self, season_number: int = None, episode_title: str = None,
+              animals_featured: Iterable[str] = None, air_date_from: str = None,
+              air_date_to: str = None, episode_number_from: int = None,
+              episode_number_to: int = None) -> List[Dict[str, Any]]:
+        """Return matching episodes in catalog order by intersecting the relevant indexes"""
+        matches: Optional[Set[int]] = None
+
+        def narrow(positions: Iterable[int]):
+            nonlocal matches
+            matches = set(positions) if matches is None else matches & set(positions)
+
+        if season_number is not None:
+            narrow(self.season_map.get(season_number, ()))
+
+        if episode_title:
+            narrow(self._title_matches(episode_title.lower()))
+
+        if animals_featured:
+            for animal in animals_featured:
+                narrow(self._animal_matches(animal.lower()))
+
+        if air_date_from or air_date_to:
+            low = datetime.strptime(air_date_from, "%Y-%m-%d").date() if air_date_from else None
+            high = datetime.strptime(air_date_to, "%Y-%m-%d").date() if air_date_to else None
+            narrow(self._range(self.air_dates, self.air_date_positions, low, high))
+
+        if episode_number_from is not None or episode_number_to is not None:
+            narrow(self._range(self.broadcast_numbers, self.broadcast_positions,
+                               episode_number_from, episode_number_to))
+
+        if matches is None:
+            return list(self.episodes)
+        return [self.episodes[position] for position in sorted(matches)]
@@ -0,0 +1,38 @@
+"""
+Compact JSON encoding for responses, using orjson when it is installed
+"""
+
+import json
+from typing import Any
+
+from metrics import JSON_ENCODE_DURATION
+
+from fastapi import Response
+
+try:
+    import orjson
+except ImportError:  # orjson is an optional speedup
+    orjson = None
+
+
+def dumps(obj: Any) -> bytes:
+    """Encode obj as compact UTF-8 JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def dumps_text(obj: Any) -> str:
+    """Encode obj as a compact JSON string, e.g. for MCP text content"""
+    with JSON_ENCODE_DURATION.time(kind="tool_text"):
+        return dumps(obj).decode()
+
+
+class FastJSONResponse(Response):
+    """JSON response that skips FastAPI's jsonable_encoder pass and encodes once, compactly"""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        with JSON_ENCODE_DURATION.time(kind="response"):
+            return dumps(content)
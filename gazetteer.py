@@ -0,0 +1,446 @@
+"""
+Offline gazetteer backing the maps tools: place names to coordinates and nearest-place queries
+
+Places are loaded once from a GeoNames-style tab-separated file (the bundled
+data/gazetteer.tsv, or any GeoNames export via GAZETTEER_FILE). Names,
+ASCII names and alternate names go into a normalized name index; coordinates
+go into a KD-tree over points on the unit sphere, where straight-line distance
+orders places the same way as great-circle distance. Lookups and nearest-place
+queries run in-process without calling any external API.
+"""
+
+import heapq
+import math
+import os
+import re
+import threading
+import unicodedata
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+from urllib.parse import quote
+
+GAZETTEER_FILE = os.environ.get(
+    "GAZETTEER_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "gazetteer.tsv")
+)
+
+# Results per search_google_maps call, by default and at most
+SEARCH_LIMIT = int(os.environ.get("GAZETTEER_SEARCH_LIMIT", "10"))
+MAX_SEARCH_LIMIT = 50
+
+# Other candidates listed when a name is ambiguous
+MAX_ALTERNATIVES = 4
+
+EARTH_RADIUS_KM = 6371.0088
+
+# GeoNames feature codes worth naming in results; anything else falls back to its feature class
+FEATURE_TYPES = {
+    "PCLI": "country", "ADM1": "state / province", "PPLC": "capital city", "PPLA": "city", "PPL": "city",
+    "PRK": "park", "RESV": "reserve", "RGN": "region", "CONT": "continent", "PT": "point",
+    "MT": "mountain", "PK": "peak", "MTS": "mountain range", "VLC": "volcano", "CNYN": "canyon",
+    "CRTR": "crater", "DSRT": "desert", "ISL": "island", "ISLS": "islands", "RK": "rock",
+    "STM": "river", "LK": "lake", "BAY": "bay", "GULF": "gulf", "OCN": "ocean", "SEA": "sea",
+    "RF": "reef", "FLLS": "waterfall", "SWMP": "swamp", "WTLD": "wetland", "DLTA": "delta", "TRNC": "trench",
+    "FRST": "forest", "ANS": "ancient site",
+}
+FEATURE_CLASSES = {
+    "A": "administrative area", "P": "populated place", "L": "area", "T": "landform",
+    "H": "water", "V": "vegetation", "S": "site", "R": "road", "U": "undersea",
+}
+
+# Words in a search mapped to the feature classes ("P") or codes ("PRK") they ask for
+SEARCH_KINDS = {
+    "place": {"P"}, "city": {"P"}, "town": {"P"}, "village": {"P"}, "capital": {"PPLC"},
+    "park": {"PRK", "RESV"}, "national park": {"PRK"}, "reserve": {"RESV"}, "refuge": {"RESV"},
+    "mountain": {"MT", "PK", "MTS", "VLC"}, "peak": {"MT", "PK"}, "volcano": {"VLC"},
+    "island": {"ISL", "ISLS"}, "desert": {"DSRT"}, "canyon": {"CNYN"},
+    "lake": {"LK"}, "river": {"STM"}, "waterfall": {"FLLS"}, "falls": {"FLLS"}, "reef": {"RF"},
+    "bay": {"BAY", "GULF"}, "ocean": {"OCN", "SEA"}, "sea": {"OCN", "SEA"},
+    "swamp": {"SWMP", "WTLD"}, "wetland": {"SWMP", "WTLD", "DLTA"},
+    "forest": {"FRST"}, "rainforest": {"FRST"}, "jungle": {"FRST"},
+    "habitat": {"L", "T", "H", "V"}, "nature": {"L", "T", "H", "V"},
+}
+
+# "parks near Denver", "lakes around 47.6,-122.3", "cities in Kenya"
+SEARCH_ANCHOR = re.compile(r"\s+(?:near|around|close to|nearby)\s+", re.IGNORECASE)
+SEARCH_WITHIN = re.compile(r"\s+in\s+", re.IGNORECASE)
+COORDINATES = re.compile(r"^\s*(-?\d+(?:\.\d+)?)\s*,\s*(-?\d+(?:\.\d+)?)\s*$")
+
+
+def normalize(name: str) -> str:
+    """Case-, accent- and punctuation-insensitive form of a name"""
+    name = unicodedata.normalize("NFKD", name)
+    name = "".join(char for char in name if not unicodedata.combining(char))
+    return " ".join(re.sub(r"[^\w]+", " ", name.casefold()).split())
+
+
+def _singular(word: str) -> str:
+    if word.endswith("ies"):
+        return word[:-3] + "y"
+    if word.endswith("s") and not word.endswith("ss") and word != "falls":
+        return word[:-1]
+    return word
+
+
+def unit_vector(latitude: float, longitude: float) -> Tuple[float, float, float]:
+    lat, lon = math.radians(latitude), math.radians(longitude)
+    return (math.cos(lat) * math.cos(lon), math.cos(lat) * math.sin(lon), math.sin(lat))
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def maps_url(latitude: float, longitude: float) -> str:
+    return f"https://www.google.com/maps/search/?api=1&query={quote(f'{latitude:.5f},{longitude:.5f}')}"
+
+
+class Place:
+    """One gazetteer entry"""
+
+    __slots__ = ("name", "latitude", "longitude", "feature_class", "feature_code", "country_code",
+                 "admin1", "population", "elevation", "names")
+
+    def __init__(self, name: str, latitude: float, longitude: float, feature_class: str = "",
+                 feature_code: str = "", country_code: str = "", admin1: str = "", population: int = 0,
+                 elevation: Optional[int] = None, names: Tuple[str, ...] = ()):
+        self.name = name
+        self.latitude = latitude
+        self.longitude = longitude
+        self.feature_class = feature_class
+        self.feature_code = feature_code
+        self.country_code = country_code
+        self.admin1 = admin1
+        self.population = population
+        self.elevation = elevation
+        self.names = names
+
+    @property
+    def kind(self) -> str:
+        return FEATURE_TYPES.get(self.feature_code) or FEATURE_CLASSES.get(self.feature_class, "place")
+
+    def to_dict(self) -> Dict[str, Any]:
+        result = {
+            'name': self.name,
+            'type': self.kind,
+            'country': self.country_code or None,
+            'latitude': self.latitude,
+            'longitude': self.longitude,
+            'mapsUrl': maps_url(self.latitude, self.longitude)
+        }
+        if self.admin1 and self.admin1 != "00":
+            result['region'] = self.admin1
+        if self.population:
+            result['population'] = self.population
+        if self.elevation is not None:
+            result['elevation'] = self.elevation
+        return result
+
+
+def parse_geonames_line(line: str) -> Optional[Place]:
+    """A Place from one GeoNames dump line, or None for comments and malformed lines"""
+    if not line.strip() or line.startswith("#"):
+        return None
+    columns = line.rstrip("\n").split("\t")
+    if len(columns) < 9:
+        return None
+    try:
+        latitude, longitude = float(columns[4]), float(columns[5])
+    except ValueError:
+        return None
+
+    def column(position: int) -> str:
+        return columns[position].strip() if len(columns) > position else ""
+
+    population = column(14)
+    elevation = column(15)
+    alternates = tuple(name.strip() for name in column(3).split(",") if name.strip())
+    return Place(
+        columns[1], latitude, longitude, column(6), column(7), column(8), column(10),
+        int(population) if population.isdigit() else 0,
+        int(elevation) if re.fullmatch(r"-?\d+", elevation) else None,
+        (columns[1], column(2)) + alternates
+    )
+
+
+class KDTree:
+    """Static 3-d tree over unit vectors with k-nearest queries; nodes live in flat lists"""
+
+    def __init__(self, points: List[Tuple[float, float, float]]):
+        self.points = points
+        self._item: List[int] = []
+        self._axis: List[int] = []
+        self._left: List[int] = []
+        self._right: List[int] = []
+        self.root = self._build(list(range(len(points))), 0)
+
+    def _build(self, items: List[int], depth: int) -> int:
+        if not items:
+            return -1
+        axis = depth % 3
+        items.sort(key=lambda item: self.points[item][axis])
+        middle = len(items) // 2
+        node = len(self._item)
+        self._item.append(items[middle])
+        self._axis.append(axis)
+        self._left.append(-1)
+        self._right.append(-1)
+        self._left[node] = self._build(items[:middle], depth + 1)
+        self._right[node] = self._build(items[middle + 1:], depth + 1)
+        return node
+
+    def nearest(self, target: Tuple[float, float, float], k: int, max_distance: float = math.inf,
+                accept: Optional[Callable[[int], bool]] = None) -> List[Tuple[float, int]]:
+        """Up to k (squared chord distance, item) pairs closest to target, nearest first"""
+        best: List[Tuple[float, int]] = []  # max-heap of (-distance, item)
+        limit = max_distance * max_distance
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            if node < 0:
+                continue
+            item = self._item[node]
+            point = self.points[item]
+            distance = ((point[0] - target[0]) ** 2 + (point[1] - target[1]) ** 2
+                        + (point[2] - target[2]) ** 2)
+            if distance <= limit and (accept is None or accept(item)):
+                if len(best) < k:
+                    heapq.heappush(best, (-distance, item))
+                elif distance < -best[0][0]:
+                    heapq.heapreplace(best, (-distance, item))
+            worst = -best[0][0] if len(best) == k else limit
+            delta = target[self._axis[node]] - point[self._axis[node]]
+            near, far = (self._left[node], self._right[node]) if delta < 0 else (self._right[node], self._left[node])
+            # Visit the far side only if the splitting plane is closer than the current k-th result
+            if delta * delta <= worst:
+                stack.append(far)
+            stack.append(near)
+        return sorted((-distance, item) for distance, item in best)
+
+
+class Gazetteer:
+    """Name and spatial indexes over the places in one GeoNames-style file, loaded on first use"""
+
+    def __init__(self, path: str = GAZETTEER_FILE):
+        self.path = path
+        self.places: Optional[List[Place]] = None
+        self._names: Dict[str, List[int]] = {}
+        self._tokens: Dict[str, Set[int]] = {}
+        self._tree: Optional[KDTree] = None
+        self._lock = threading.Lock()
+
+    def load(self) -> "Gazetteer":
+        """Read the file and build the indexes; safe to call repeatedly and from threads"""
+        if self.places is not None:
+            return self
+        with self._lock:
+            if self.places is not None:
+                return self
+            places = []
+            with open(self.path, encoding="utf-8") as handle:
+                for line in handle:
+                    place = parse_geonames_line(line)
+                    if place is not None:
+                        places.append(place)
+
+            names: Dict[str, List[int]] = {}
+            tokens: Dict[str, Set[int]] = {}
+            for position, place in enumerate(places):
+                for name in {normalize(name) for name in place.names} - {""}:
+                    names.setdefault(name, []).append(position)
+                    for token in name.split():
+                        tokens.setdefault(token, set()).add(position)
+            # The most populous place wins an ambiguous name ("Paris" is not Paris, Texas)
+            for positions in names.values():
+                positions.sort(key=lambda position: -places[position].population)
+
+            self._names = names
+            self._tokens = tokens
+            self._tree = KDTree([unit_vector(place.latitude, place.longitude) for place in places])
+            self.places = places
+        return self
+
+    def __len__(self) -> int:
+        return len(self.load().places)
+
+    def _qualifier(self, text: str) -> Set[Tuple[str, str]]:
+        """(country, admin1) pairs a qualifier such as "Kenya", "CA" or "Wyoming" may mean"""
+        constraints = set()
+        if len(text) == 2 and text.isalpha():
+            constraints.add((text.upper(), ""))
+        for position in self._names.get(normalize(text), []):
+            place = self.places[position]
+            if place.feature_code.startswith("PCL"):
+                constraints.add((place.country_code, ""))
+            elif place.feature_code == "ADM1":
+                constraints.add((place.country_code, place.admin1))
+        return constraints
+
+    def lookup(self, query: str) -> List[Place]:
+        """Places matching a name, best first; "Name, Region, Country" narrows by the qualifiers"""
+        self.load()
+        name, *qualifiers = [part.strip() for part in query.split(",") if part.strip()] or [""]
+        key = normalize(name)
+        if not key:
+            return []
+
+        positions = self._names.get(key)
+        if not positions:
+            # Every word of the query must appear in the place's names
+            words = [self._tokens.get(token, set()) for token in key.split()]
+            matches = set.intersection(*words) if all(words) else set()
+            positions = sorted(matches, key=lambda position: -self.places[position].population)
+
+        places = [self.places[position] for position in positions]
+        for qualifier in qualifiers:
+            constraints = self._qualifier(qualifier)
+            places = [place for place in places
+                      if any(place.country_code == country and (not admin1 or place.admin1 == admin1)
+                             for country, admin1 in constraints)]
+        return places
+
+    def resolve(self, query: str) -> Optional[Tuple[float, float, Optional[Place]]]:
+        """(latitude, longitude, place) for a name or a "lat,lon" pair, or None if nothing matches"""
+        match = COORDINATES.match(query)
+        if match:
+            latitude, longitude = float(match.group(1)), float(match.group(2))
+            if -90 <= latitude <= 90 and -180 <= longitude <= 180:
+                return latitude, longitude, None
+        places = self.lookup(query)
+        if not places:
+            return None
+        return places[0].latitude, places[0].longitude, places[0]
+
+    def nearest(self, latitude: float, longitude: float, limit: int = SEARCH_LIMIT,
+                radius_km: Optional[float] = None,
+                accept: Optional[Callable[[Place], bool]] = None) -> List[Tuple[float, Place]]:
+        """Up to limit (distance in km, place) pairs nearest to a point, nearest first"""
+        self.load()
+        max_chord = math.inf
+        if radius_km is not None:
+            max_chord = 2 * math.sin(min(radius_km / EARTH_RADIUS_KM, math.pi) / 2)
+        matches = self._tree.nearest(
+            unit_vector(latitude, longitude), limit, max_chord,
+            None if accept is None else lambda position: accept(self.places[position])
+        )
+        return [(haversine_km(latitude, longitude, self.places[position].latitude,
+                              self.places[position].longitude), self.places[position])
+                for _, position in matches]
+
+
+def _kind_filter(words: str) -> Optional[Set[str]]:
+    """Feature classes / codes asked for by the "what" half of a search, if it names a kind"""
+    key = " ".join(_singular(word) for word in normalize(words).split())
+    for prefix in ("", "the "):
+        if key.startswith(prefix) and key[len(prefix):] in SEARCH_KINDS:
+            return SEARCH_KINDS[key[len(prefix):]]
+    return None
+
+
+def _accepts(kinds: Set[str]) -> Callable[[Place], bool]:
+    return lambda place: place.feature_class in kinds or place.feature_code in kinds
+
+
+def view_location(query: str, index: Optional[Gazetteer] = None) -> Dict[str, Any]:
+    """Resolve a place name (or "lat,lon") to coordinates and a map link"""
+    index = (index or gazetteer).load()
+    query = (query or "").strip()
+    if not query:
+        return {'error': "A location is required"}
+
+    resolved = index.resolve(query)
+    if resolved is None:
+        return {'error': f"No place found matching: {query}", 'query': query}
+    latitude, longitude, place = resolved
+
+    if place is None:
+        # Raw coordinates: describe the closest known place
+        result = {'query': query, 'latitude': latitude, 'longitude': longitude,
+                  'mapsUrl': maps_url(latitude, longitude)}
+        nearest = index.nearest(latitude, longitude, 1)
+        if nearest:
+            distance, closest = nearest[0]
+            result['nearestPlace'] = dict(closest.to_dict(), distanceKm=round(distance, 1))
+        return result
+
+    result = {'query': query}
+    result.update(place.to_dict())
+    alternatives = [other for other in index.lookup(query) if other is not place][:MAX_ALTERNATIVES]
+    if alternatives:
+        result['alternatives'] = [{'name': other.name, 'type': other.kind, 'country': other.country_code or None,
+                                   'latitude': other.latitude, 'longitude': other.longitude}
+                                  for other in alternatives]
+    return result
+
+
+def search_places(search: str, limit: int = None, radius_km: float = None,
+                  index: Optional[Gazetteer] = None) -> Dict[str, Any]:
+    """Nearest places to a location, optionally of one kind: "parks near Denver", "cities in Kenya", "Nairobi" """
+    index = (index or gazetteer).load()
+    search = (search or "").strip()
+    if not search:
+        return {'error': "A search is required"}
+    try:
+        limit = max(1, min(int(limit or SEARCH_LIMIT), MAX_SEARCH_LIMIT))
+    except (TypeError, ValueError):
+        return {'error': f"limit must be a whole number, got: {limit!r}", 'search': search, 'results': [], 'count': 0}
+    if radius_km is not None:
+        try:
+            radius_km = float(radius_km)
+        except (TypeError, ValueError):
+            radius_km = math.nan
+        if not radius_km >= 0:
+            return {'error': "radiusKm must be a distance of 0 km or more", 'search': search,
+                    'results': [], 'count': 0}
+
+    what, anchor, within = "", search, False
+    parts = SEARCH_ANCHOR.split(search, maxsplit=1)
+    if len(parts) == 2:
+        what, anchor = parts
+    else:
+        parts = SEARCH_WITHIN.split(search)
+        if len(parts) > 1:
+            what, anchor, within = " in ".join(parts[:-1]), parts[-1], True
+
+    resolved = index.resolve(anchor)
+    if resolved is None and what:
+        # "Lake in the Clouds" style names: fall back to the whole search as a place name
+        what, anchor, within = "", search, False
+        resolved = index.resolve(anchor)
+    if resolved is None:
+        return {'error': f"No place found matching: {anchor}", 'search': search, 'results': [], 'count': 0}
+    latitude, longitude, center = resolved
+
+    accept = None
+    if what:
+        kinds = _kind_filter(what)
+        if kinds is not None:
+            accept = _accepts(kinds)
+        else:
+            wanted = set(normalize(what).split())
+            accept = lambda place: wanted <= set(" ".join(normalize(name) for name in place.names).split())
+
+    if center is not None:
+        kind = accept
+        if within and (center.feature_code.startswith("PCL") or center.feature_code == "ADM1"):
+            # "in Kenya" / "in Wyoming" keeps results inside that country or state
+            def accept(place, center=center):
+                return (place is not center and place.country_code == center.country_code
+                        and (center.feature_code != "ADM1" or place.admin1 == center.admin1)
+                        and (kind is None or kind(place)))
+        else:
+            # Never answer "near X" with X itself
+            def accept(place, center=center):
+                return place is not center and (kind is None or kind(place))
+
+    results = [dict(place.to_dict(), distanceKm=round(distance, 1))
+               for distance, place in index.nearest(latitude, longitude, limit, radius_km, accept)]
+    return {
+        'search': search,
+        'center': {'name': center.name if center else None, 'latitude': latitude, 'longitude': longitude},
+        'results': results,
+        'count': len(results)
+    }
+
+
+gazetteer = Gazetteer()
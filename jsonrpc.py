@@ -0,0 +1,212 @@
+"""
+JSON-RPC 2.0 helpers shared by the /mcp endpoints
+"""
+
+import asyncio
+import hashlib
+import os
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from fastapi import Request, Response
+from fastapi.responses import StreamingResponse
+
+from compression import MIN_SIZE, compress, negotiate, weak_etag
+from fastjson import FastJSONResponse, dumps, dumps_text
+from metrics import cache_result
+from progress import progress_reporting
+
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INTERNAL_ERROR = -32603
+# Implementation-defined server errors used by admission control
+SERVER_OVERLOADED = -32000
+RATE_LIMITED = -32001
+
+# Messages accepted in one JSON-RPC batch, and how many of them run at once
+MAX_BATCH_SIZE = int(os.environ.get("RPC_MAX_BATCH_SIZE", "50"))
+BATCH_CONCURRENCY = int(os.environ.get("RPC_BATCH_CONCURRENCY", "8"))
+
+# Compressed JSON-RPC envelopes kept per CachedJSON; clients tend to reuse small ids such as 1 or 2
+ENVELOPE_CACHE_SIZE = 64
+
+RpcHandler = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+
+def rpc_error(request_id: Any, code: int, message: str) -> Dict[str, Any]:
+    return {
+        "jsonrpc": "2.0",
+        "id": request_id,
+        "error": {
+            "code": code,
+            "message": message
+        }
+    }
+
+
+class CachedJSON:
+    """A JSON payload encoded once into bytes with a strong ETag; compressed forms are cached too"""
+
+    def __init__(self, payload: Any):
+        self.payload = payload
+        self.body = dumps(payload)
+        self.etag = '"' + hashlib.sha256(self.body).hexdigest()[:32] + '"'
+        self.headers = {"ETag": self.etag, "Cache-Control": "no-cache"}
+        self._compressed: Dict[str, bytes] = {}
+        self._envelopes: "OrderedDict[Tuple[str, bytes], bytes]" = OrderedDict()
+
+    def _encoded_response(self, request: Request, body: bytes, compressed: Callable[[str], bytes],
+                          headers: Dict[str, str]) -> Response:
+        encoding = negotiate(request.headers.get("accept-encoding"))
+        if encoding is None or len(body) < MIN_SIZE:
+            return Response(body, media_type="application/json", headers=headers)
+        headers = dict(headers, Vary="Accept-Encoding")
+        if "ETag" in headers:
+            headers["ETag"] = weak_etag(headers["ETag"])
+        headers["Content-Encoding"] = encoding
+        return Response(compressed(encoding), media_type="application/json", headers=headers)
+
+    def _compressed_body(self, encoding: str) -> bytes:
+        body = self._compressed.get(encoding)
+        cache_result("compressed_body", body is not None)
+        if body is None:
+            body = self._compressed[encoding] = compress(self.body, encoding)
+        return body
+
+    def matches(self, request: Request) -> bool:
+        """True if the client's If-None-Match already names this payload"""
+        if_none_match = request.headers.get("if-none-match")
+        tags = [tag.strip() for tag in if_none_match.split(",")] if if_none_match else []
+        matched = "*" in tags or any(tag.removeprefix("W/") == self.etag for tag in tags)
+        cache_result("etag", matched)
+        return matched
+
+    def response(self, request: Request) -> Response:
+        """Serve the pre-encoded payload, or 304 Not Modified"""
+        if self.matches(request):
+            return Response(status_code=304, headers=self.headers)
+        return self._encoded_response(request, self.body, self._compressed_body, self.headers)
+
+    def rpc_response(self, request: Request, request_id: Any) -> Response:
+        """Serve the payload as a JSON-RPC result, splicing the pre-encoded bytes into the envelope.
+
+        No ETag and no 304: the envelope differs per request id, and a JSON-RPC
+        client needs a body to match to its request.
+        """
+        encoded_id = dumps(request_id)
+        body = b'{"jsonrpc":"2.0","id":' + encoded_id + b',"result":' + self.body + b'}'
+
+        def compressed(encoding: str) -> bytes:
+            key = (encoding, encoded_id)
+            envelope = self._envelopes.get(key)
+            cache_result("compressed_body", envelope is not None)
+            if envelope is None:
+                envelope = self._envelopes[key] = compress(body, encoding)
+                while len(self._envelopes) > ENVELOPE_CACHE_SIZE:
+                    self._envelopes.popitem(last=False)
+            else:
+                self._envelopes.move_to_end(key)
+            return envelope
+
+        return self._encoded_response(request, body, compressed, {})
+
+
+async def _handle_batch_message(message: Any, handle: RpcHandler,
+                                slots: asyncio.Semaphore) -> Optional[Dict[str, Any]]:
+    if not isinstance(message, dict):
+        return rpc_error(None, INVALID_REQUEST, "Invalid Request")
+
+    try:
+        async with slots:
+            response = await handle(message)
+    except Exception as e:
+        response = rpc_error(message.get("id"), INTERNAL_ERROR, str(e))
+
+    # Notifications (no "id" member) are executed but never answered
+    if "id" not in message:
+        return None
+    return response
+
+
+async def handle_rpc_batch(messages: List[Any], handle: RpcHandler) -> Response:
+    """Execute the messages of a JSON-RPC batch, BATCH_CONCURRENCY at a time, and reply with one array"""
+    if not messages:
+        return FastJSONResponse(rpc_error(None, INVALID_REQUEST, "Invalid Request: empty batch"))
+    if len(messages) > MAX_BATCH_SIZE:
+        return FastJSONResponse(rpc_error(
+            None, INVALID_REQUEST, f"Invalid Request: batch of {len(messages)} messages exceeds {MAX_BATCH_SIZE}"))
+
+    slots = asyncio.Semaphore(max(BATCH_CONCURRENCY, 1))
+    responses = await asyncio.gather(*(_handle_batch_message(message, handle, slots) for message in messages))
+    responses = [response for response in responses if response is not None]
+
+    if not responses:
+        # A batch made only of notifications gets no body at all
+        return Response(status_code=202)
+    return FastJSONResponse(responses)
+
+
+def wants_event_stream(request: Request, message: Any) -> bool:
+    """Stream tool calls to clients that accept server-sent events (MCP streamable HTTP)"""
+    return (
+        isinstance(message, dict)
+        and message.get("method") == "tools/call"
+        and "text/event-stream" in request.headers.get("accept", "")
+    )
+
+
+def _sse_event(message: Dict[str, Any]) -> str:
+    return f"event: message\ndata: {dumps_text(message)}\n\n"
+
+
+def stream_rpc(message: Dict[str, Any], handle: RpcHandler) -> StreamingResponse:
+    """Answer one JSON-RPC message as an SSE stream.
+
+    Headers go out immediately; progress notifications (with any partial
+    results under _meta) follow as work such as a catalog crawl advances,
+    and the final JSON-RPC response closes the stream. Progress is only sent
+    when the request carries params._meta.progressToken.
+    """
+    params = message.get("params") or {}
+    progress_token = (params.get("_meta") or {}).get("progressToken")
+    queue: asyncio.Queue = asyncio.Queue()
+
+    def send_progress(progress, total, text, partial):
+        if progress_token is None:
+            return
+        notification_params = {"progressToken": progress_token, "progress": progress, "message": text}
+        if total is not None:
+            notification_params["total"] = total
+        if partial is not None:
+            notification_params["_meta"] = {"partialResult": partial}
+        queue.put_nowait({"jsonrpc": "2.0", "method": "notifications/progress", "params": notification_params})
+
+    async def run() -> Dict[str, Any]:
+        with progress_reporting(send_progress):
+            try:
+                return await handle(message)
+            except Exception as e:
+                return rpc_error(message.get("id"), INTERNAL_ERROR, str(e))
+
+    async def events() -> AsyncIterator[str]:
+        task = asyncio.create_task(run())
+        try:
+            # Flush headers right away so time-to-first-byte does not wait on the tool
+            yield ": stream open\n\n"
+            while not task.done():
+                next_event = asyncio.create_task(queue.get())
+                await asyncio.wait({task, next_event}, return_when=asyncio.FIRST_COMPLETED)
+                if next_event.done():
+                    yield _sse_event(next_event.result())
+                else:
+                    next_event.cancel()
+            while not queue.empty():
+                yield _sse_event(queue.get_nowait())
+            yield _sse_event(task.result())
+        finally:
+            if not task.done():
+                task.cancel()
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache"})
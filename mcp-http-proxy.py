@@ -5,13 +5,19 @@ For use with Claude Code CLI
 """
 
 import sys
+import gzip
 import json
 import urllib.request
 import urllib.error
 
+from proxy_cache import open_cache
+
 SERVER_URL = "https://web-production-347ab.up.railway.app/mcp"
 
 def main():
+    # Optional local response cache (MCP_PROXY_CACHE=1)
+    cache = open_cache()
+
     for line in sys.stdin:
         line = line.strip()
         if not line:
@@ -19,19 +25,31 @@ def main():
         
         try:
             request = json.loads(line)
-            
+
+            cached = cache.get(request) if cache is not None else None
+            if cached is not None:
+                print(json.dumps(cached), flush=True)
+                continue
+
             # Create HTTP request
             req = urllib.request.Request(
                 SERVER_URL,
                 data=json.dumps(request).encode(),
-                headers={'Content-Type': 'application/json'}
+                headers={'Content-Type': 'application/json', 'Accept-Encoding': 'gzip'}
             )
             
             # Send request and get response
             with urllib.request.urlopen(req, timeout=30) as response:
-                response_data = response.read().decode()
+                response_data = response.read()
+                # urllib does not decode Content-Encoding itself
+                if response.headers.get('Content-Encoding') == 'gzip':
+                    response_data = gzip.decompress(response_data)
+                response_data = response_data.decode()
                 response_json = json.loads(response_data)
-                
+
+            if cache is not None:
+                cache.put(request, response_json)
+
             # Output response
             print(json.dumps(response_json), flush=True)
             
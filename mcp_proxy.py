@@ -2,97 +2,59 @@
 """
 MCP Proxy for Wild Kratts Server
 Converts stdio MCP protocol to HTTP calls for Railway deployment
+
+Requests are forwarded concurrently over one persistent connection pool, and
+each response is written back as soon as it completes (matched by id), so a
+slow product search never holds up the calls behind it.
 """
 
-import sys
+import asyncio
 import json
-import requests
-import time
+import os
+import sys
+import threading
+from typing import Any, Dict, Optional
+
+import httpx
+
+from proxy_cache import ProxyCache, open_cache
+
+SERVER_URL = os.environ.get("MCP_SERVER_URL", "https://web-production-347ab.up.railway.app/mcp")
+REQUEST_TIMEOUT = float(os.environ.get("MCP_PROXY_TIMEOUT", "30"))
+MAX_CONNECTIONS = int(os.environ.get("MCP_PROXY_MAX_CONNECTIONS", "10"))
+
+# httpx advertises and decodes gzip and deflate, plus br / zstd when brotli / zstandard are
+# installed, so large tool results cross the WAN compressed; set to 0 to request identity
+COMPRESSION = os.environ.get("MCP_PROXY_COMPRESSION", "1") == "1"
+
+try:
+    import h2  # noqa: F401  (HTTP/2 is used when the optional h2 package is installed)
+    HTTP2 = True
+except ImportError:
+    HTTP2 = False
 
-SERVER_URL = "https://web-production-347ab.up.railway.app/mcp"
 
 def log_debug(message):
     """Log debug messages to stderr"""
-    print(f"[MCP-PROXY] {message}", file=sys.stderr)
+    print(f"[MCP-PROXY] {message}", file=sys.stderr, flush=True)
 
-def handle_tools_list(request_id):
-    """Handle tools/list method"""
-    try:
-        response = requests.post(
-            SERVER_URL,
-            json={
-                "jsonrpc": "2.0",
-                "id": request_id,
-                "method": "tools/list",
-                "params": {}
-            },
-            headers={'Content-Type': 'application/json'},
-            timeout=30
-        )
-        
-        if response.ok:
-            return response.json()
-        else:
-            return {
-                "jsonrpc": "2.0",
-                "id": request_id,
-                "error": {
-                    "code": -32603,
-                    "message": f"HTTP {response.status_code}: {response.text}"
-                }
-            }
-            
-    except Exception as e:
-        log_debug(f"Error in tools/list: {e}")
-        return {
-            "jsonrpc": "2.0",
-            "id": request_id,
-            "error": {
-                "code": -32603,
-                "message": f"Request failed: {str(e)}"
-            }
-        }
 
-def handle_tools_call(request_id, tool_name, arguments):
-    """Handle tools/call method"""
-    try:
-        response = requests.post(
-            SERVER_URL,
-            json={
-                "jsonrpc": "2.0",
-                "id": request_id,
-                "method": "tools/call",
-                "params": {
-                    "name": tool_name,
-                    "arguments": arguments
-                }
-            },
-            headers={'Content-Type': 'application/json'},
-            timeout=30
-        )
-        
-        if response.ok:
-            return response.json()
-        else:
-            return {
-                "jsonrpc": "2.0",
-                "id": request_id,
-                "error": {
-                    "code": -32603,
-                    "message": f"HTTP {response.status_code}: {response.text}"
-                }
-            }
-            
-    except Exception as e:
-        log_debug(f"Error in tools/call: {e}")
-        return {
-            "jsonrpc": "2.0",
-            "id": request_id,
-            "error": {
-                "code": -32603,
-                "message": f"Request failed: {str(e)}"
-            }
+def rpc_error(request_id: Any, code: int, message: str) -> Dict[str, Any]:
+    return {
+        "jsonrpc": "2.0",
+        "id": request_id,
+        "error": {
+            "code": code,
+            "message": message
         }
+    }
+
+
+def write_message(message: Dict[str, Any]):
+    """Write one JSON-RPC message to stdout; only ever called from the event loop thread"""
+    sys.stdout.write(json.dumps(message) + "\n")
+    sys.stdout.flush()
+
 
 def handle_initialize(request_id):
     """Handle initialize method"""
@@ -111,80 +73,157 @@ def handle_initialize(request_id):
         }
     }
 
-def main():
-    """Main proxy loop"""
-    log_debug("Starting Wild Kratts MCP Proxy")
-    log_debug(f"Server URL: {SERVER_URL}")
-    
+
+async def forward(client: httpx.AsyncClient, request: Dict[str, Any]) -> Dict[str, Any]:
+    """Forward a tools/list or tools/call request to the server"""
+    request_id = request.get("id")
+    try:
+        response = await client.post(SERVER_URL, json=request)
+    except Exception as e:
+        log_debug(f"Error in {request.get('method')}: {e}")
+        return rpc_error(request_id, -32603, f"Request failed: {str(e)}")
+
+    if response.is_success:
+        return response.json()
+    return rpc_error(request_id, -32603, f"HTTP {response.status_code}: {response.text}")
+
+
+class Proxy:
+    """Dispatches stdin messages concurrently and writes responses as they complete"""
+
+    def __init__(self, client: httpx.AsyncClient, cache: Optional[ProxyCache] = None):
+        self.client = client
+        self.cache = cache
+        self.in_flight: Dict[Any, asyncio.Task] = {}
+
+    async def handle(self, request: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        method = request.get("method")
+        request_id = request.get("id")
+        params = request.get("params") or {}
+
+        if method == "initialize":
+            return handle_initialize(request_id)
+
+        elif method in ("tools/list", "tools/call"):
+            if self.cache is not None:
+                cached = self.cache.get(request)
+                if cached is not None:
+                    log_debug(f"Cache hit: {method}")
+                    return cached
+            response = await forward(self.client, request)
+            if self.cache is not None:
+                self.cache.put(request, response)
+            return response
+
+        elif method == "notifications/cancelled":
+            task = self.in_flight.get(params.get("requestId"))
+            if task is not None:
+                task.cancel()
+            return None
+
+        elif method and method.startswith("notifications/"):
+            return None
+
+        return rpc_error(request_id, -32601, f"Method not found: {method}")
+
+    async def run_request(self, request: Dict[str, Any]):
+        method = request.get("method", "unknown")
+        try:
+            response = await self.handle(request)
+        except asyncio.CancelledError:
+            # The client cancelled this request, so it expects no response
+            log_debug(f"Cancelled: {method}")
+            return
+        except Exception as e:
+            log_debug(f"Unexpected error: {e}")
+            response = rpc_error(request.get("id"), -32603, f"Internal error: {str(e)}")
+        finally:
+            if self.in_flight.get(request.get("id")) is asyncio.current_task():
+                del self.in_flight[request["id"]]
+
+        # Notifications are never answered
+        if response is not None and "id" in request:
+            write_message(response)
+            log_debug(f"Sent response for: {method}")
+
+    def dispatch(self, line: str) -> Optional[asyncio.Task]:
+        try:
+            request = json.loads(line)
+        except json.JSONDecodeError as e:
+            log_debug(f"JSON decode error: {e}")
+            write_message(rpc_error(None, -32700, "Parse error"))
+            return None
+
+        if not isinstance(request, dict):
+            write_message(rpc_error(None, -32600, "Invalid Request"))
+            return None
+
+        log_debug(f"Received request: {request.get('method', 'unknown')}")
+        task = asyncio.create_task(self.run_request(request))
+        if request.get("id") is not None:
+            self.in_flight[request["id"]] = task
+        return task
+
+
+def read_stdin(loop: asyncio.AbstractEventLoop, lines: asyncio.Queue):
+    """Feed stdin lines to the event loop; None marks end of input"""
     try:
         for line in sys.stdin:
+            loop.call_soon_threadsafe(lines.put_nowait, line)
+    finally:
+        try:
+            loop.call_soon_threadsafe(lines.put_nowait, None)
+        except RuntimeError:  # the loop already shut down
+            pass
+
+
+async def run():
+    limits = httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_CONNECTIONS)
+    async with httpx.AsyncClient(
+        http2=HTTP2,
+        limits=limits,
+        timeout=REQUEST_TIMEOUT,
+        headers={"Content-Type": "application/json"} if COMPRESSION else
+                {"Content-Type": "application/json", "Accept-Encoding": "identity"}
+    ) as client:
+        proxy = Proxy(client, open_cache())
+        pending = set()
+        lines: asyncio.Queue = asyncio.Queue()
+        # A daemon reader thread works on every platform's event loop and never blocks shutdown
+        threading.Thread(target=read_stdin, args=(asyncio.get_running_loop(), lines), daemon=True).start()
+        while True:
+            line = await lines.get()
+            if line is None:
+                break
             line = line.strip()
             if not line:
                 continue
-                
-            try:
-                request = json.loads(line)
-                log_debug(f"Received request: {request.get('method', 'unknown')}")
-                
-                method = request.get("method")
-                request_id = request.get("id")
-                params = request.get("params", {})
-                
-                if method == "initialize":
-                    response = handle_initialize(request_id)
-                    
-                elif method == "tools/list":
-                    response = handle_tools_list(request_id)
-                    
-                elif method == "tools/call":
-                    tool_name = params.get("name")
-                    arguments = params.get("arguments", {})
-                    response = handle_tools_call(request_id, tool_name, arguments)
-                    
-                else:
-                    response = {
-                        "jsonrpc": "2.0",
-                        "id": request_id,
-                        "error": {
-                            "code": -32601,
-                            "message": f"Method not found: {method}"
-                        }
-                    }
-                
-                # Send response to stdout
-                print(json.dumps(response), flush=True)
-                log_debug(f"Sent response for: {method}")
-                
-            except json.JSONDecodeError as e:
-                log_debug(f"JSON decode error: {e}")
-                error_response = {
-                    "jsonrpc": "2.0",
-                    "id": None,
-                    "error": {
-                        "code": -32700,
-                        "message": "Parse error"
-                    }
-                }
-                print(json.dumps(error_response), flush=True)
-                
-            except Exception as e:
-                log_debug(f"Unexpected error: {e}")
-                error_response = {
-                    "jsonrpc": "2.0",
-                    "id": request.get("id") if 'request' in locals() else None,
-                    "error": {
-                        "code": -32603,
-                        "message": f"Internal error: {str(e)}"
-                    }
-                }
-                print(json.dumps(error_response), flush=True)
-                
+            task = proxy.dispatch(line)
+            if task is not None:
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+
+        # stdin closed: let the requests already in flight finish before exiting
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        if proxy.cache is not None:
+            proxy.cache.close()
+
+
+def main():
+    """Main proxy loop"""
+    log_debug("Starting Wild Kratts MCP Proxy")
+    log_debug(f"Server URL: {SERVER_URL} (HTTP/2: {'on' if HTTP2 else 'off'})")
+
+    try:
+        asyncio.run(run())
     except KeyboardInterrupt:
         log_debug("Proxy interrupted by user")
     except Exception as e:
         log_debug(f"Fatal error: {e}")
-        
+
     log_debug("MCP Proxy stopped")
 
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
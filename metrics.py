@@ -0,0 +1,294 @@
+"""
+Prometheus-style runtime metrics, exposed in the text exposition format on /metrics
+
+A deliberately small, dependency-free registry: counters, gauges and
+histograms with labels, an ASGI middleware for HTTP latency and in-flight
+requests, and an event-loop lag monitor.
+"""
+
+import asyncio
+import math
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from fastapi import Response
+
+# Seconds; spans sub-millisecond index lookups up to full catalog crawls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LOOP_LAG_INTERVAL = 0.5
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Client-supplied label values are bounded so a misbehaving client cannot explode cardinality
+MCP_METHODS = {"initialize", "ping", "tools/list", "tools/call", "notifications/initialized"}
+MAX_TOOL_LABELS = 50
+_tool_labels = set()
+
+_registry: List["Metric"] = []
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[Any]) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric:
+    """A named metric family with a fixed set of label names"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], Any] = {}
+        _registry.append(self)
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def samples(self) -> Iterable[str]:
+        for key, value in self._values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track_inprogress(self, **labels):
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        state = self._values.get(key)
+        if state is None:
+            state = self._values[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+        for position, bound in enumerate(self.buckets):
+            if value <= bound:
+                state["counts"][position] += 1
+                break
+        state["sum"] += value
+        state["count"] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self) -> Iterable[str]:
+        for key, state in self._values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, state["counts"]):
+                cumulative += count
+                labels = _format_labels(self.labelnames + ("le",), key + (_format_value(bound),))
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_value(state['sum'])}"
+            yield f"{self.name}_count{labels} {state['count']}"
+
+
+# HTTP layer
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "HTTP request latency until the response is fully sent",
+    ("method", "path", "status"))
+HTTP_REQUESTS_IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests currently being served")
+
+# MCP JSON-RPC layer
+MCP_REQUEST_DURATION = Histogram(
+    "mcp_request_duration_seconds", "Latency of one /mcp JSON-RPC message by method and tool",
+    ("method", "tool", "outcome"))
+MCP_REQUESTS_IN_FLIGHT = Gauge("mcp_requests_in_flight", "/mcp JSON-RPC messages currently executing", ("method",))
+JSON_ENCODE_DURATION = Histogram(
+    "json_encode_duration_seconds", "Time spent encoding response bodies and tool results", ("kind",))
+COMPRESSION_DURATION = Histogram(
+    "response_compression_duration_seconds", "Time spent compressing response bodies", ("encoding",))
+COMPRESSION_BYTES = Counter(
+    "response_compression_bytes_total", "Response bytes before (raw) and after (compressed) compression",
+    ("encoding", "stage"))
+
+# Admission control in front of the tool endpoints
+ADMISSION_REQUESTS = Counter(
+    "admission_requests_total", "Tool requests by admission result (admitted, queued, rate_limited, too_large, shed, timed_out)",
+    ("result",))
+ADMISSION_ACTIVE = Gauge("admission_active_requests", "Execution slots held by admitted tool requests (one per batch message)")
+ADMISSION_QUEUE_DEPTH = Gauge("admission_queue_depth", "Tool requests waiting for an execution slot")
+
+# Upstream WordPress API
+UPSTREAM_REQUEST_DURATION = Histogram(
+    "upstream_request_duration_seconds", "Upstream request latency by endpoint and status",
+    ("endpoint", "status"))
+UPSTREAM_REQUESTS_IN_FLIGHT = Gauge("upstream_requests_in_flight", "Upstream requests currently open", ("endpoint",))
+UPSTREAM_RETRIES = Counter("upstream_retries_total", "Upstream requests retried after a failure", ("endpoint",))
+UPSTREAM_CIRCUIT_STATE = Gauge(
+    "upstream_circuit_state", "Circuit breaker state per endpoint (0 closed, 1 half-open, 2 open)", ("endpoint",))
+
+# Caches: ratio = hit / (hit + miss) per cache
+CACHE_REQUESTS = Counter("cache_requests_total", "Cache lookups by cache and result", ("cache", "result"))
+
+# Runtime
+EVENT_LOOP_LAG = Gauge("event_loop_lag_seconds", "Most recent event-loop scheduling delay")
+EVENT_LOOP_LAG_HISTOGRAM = Histogram("event_loop_lag_distribution_seconds", "Event-loop scheduling delay")
+
+
+def cache_result(cache: str, hit: bool):
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+def render() -> bytes:
+    """Every registered metric in the Prometheus text exposition format"""
+    return ("\n".join(metric.render() for metric in _registry) + "\n").encode()
+
+
+def metrics_response() -> Response:
+    return Response(render(), media_type=CONTENT_TYPE)
+
+
+def _tool_label(tool: Any) -> str:
+    if not isinstance(tool, str):
+        return "other"
+    if tool not in _tool_labels:
+        if len(_tool_labels) >= MAX_TOOL_LABELS:
+            return "other"
+        _tool_labels.add(tool)
+    return tool
+
+
+def timed_rpc(handle: Callable[[Dict[str, Any]], Awaitable[Any]]) -> Callable[[Dict[str, Any]], Awaitable[Any]]:
+    """Wrap a single-message JSON-RPC handler with per method / tool latency and in-flight metrics"""
+
+    @wraps(handle)
+    async def wrapper(message: Dict[str, Any]) -> Any:
+        method = message.get("method")
+        method = method if isinstance(method, str) and method in MCP_METHODS else "other"
+        params = message.get("params") or {}
+        tool = params.get("name", "") if method == "tools/call" and isinstance(params, dict) else ""
+        tool = _tool_label(tool)
+        outcome = "error"
+        started = time.perf_counter()
+        with MCP_REQUESTS_IN_FLIGHT.track_inprogress(method=method):
+            try:
+                response = await handle(message)
+                if not (isinstance(response, dict) and "error" in response):
+                    outcome = "ok"
+                return response
+            finally:
+                MCP_REQUEST_DURATION.observe(time.perf_counter() - started,
+                                             method=method, tool=tool, outcome=outcome)
+
+    return wrapper
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency and in-flight count for every HTTP request"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        with HTTP_REQUESTS_IN_FLIGHT.track_inprogress():
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                # Label by route template so path parameters cannot explode cardinality
+                route = scope.get("route")
+                path = getattr(route, "path", None) or "unmatched"
+                HTTP_REQUEST_DURATION.observe(time.perf_counter() - started, method=scope["method"],
+                                              path=path, status=status["code"])
+
+
+class LoopLagMonitor:
+    """Measures how late the event loop wakes a periodic sleeper"""
+
+    def __init__(self, interval: float = LOOP_LAG_INTERVAL):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - started - self.interval)
+            EVENT_LOOP_LAG.set(lag)
+            EVENT_LOOP_LAG_HISTOGRAM.observe(lag)
+
+    async def __aenter__(self):
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+
+loop_lag_monitor = LoopLagMonitor()
@@ -0,0 +1,152 @@
+"""
+Pre-fork multi-worker serving: load the catalogs once, then fork workers that share them copy-on-write
+
+With WEB_CONCURRENCY above 1 the parent loads the catalog snapshot and
+builds the query indexes before forking, so every worker starts warm and
+shares that memory with the others until it is written to. Workers accept
+connections from one listening socket. The parent restarts workers that die
+and forwards SIGTERM / SIGINT for a graceful shutdown. Upstream refreshes are
+coordinated through the shared snapshot's refresh lease (see catalog.py).
+"""
+
+import gc
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+import traceback
+from typing import Any, Dict
+
+import uvicorn
+
+from gazetteer import gazetteer
+
+logger = logging.getLogger("prefork")
+
+# Worker processes: a number, or "auto" for one per CPU
+WEB_CONCURRENCY = os.environ.get("WEB_CONCURRENCY", "1")
+
+# Pause before replacing a worker that died, so a crash loop does not spin
+RESTART_DELAY = 1.0
+
+
+def worker_count(value: str = WEB_CONCURRENCY) -> int:
+    if value.strip().lower() == "auto":
+        return os.cpu_count() or 1
+    return max(int(value), 1)
+
+
+def preload(api: Any):
+    """Load every catalog snapshot and the gazetteer in this process so forked workers inherit them"""
+    for catalog in (api.episode_catalog, api.product_catalog):
+        try:
+            if catalog.preload_snapshot():
+                logger.info("Preloaded %d %s", len(catalog.items), catalog.snapshot_name)
+            else:
+                logger.info("No %s snapshot yet; the first worker to need it will crawl upstream",
+                            catalog.snapshot_name)
+        except Exception as error:
+            logger.warning("Could not preload the %s snapshot: %s", catalog.snapshot_name, error)
+    try:
+        logger.info("Loaded %d gazetteer places", len(gazetteer.load().places))
+    except Exception as error:
+        logger.warning("Could not load the gazetteer: %s", error)
+    # Keep the preloaded objects out of the cyclic GC so collections in the
+    # workers do not write to, and so un-share, the pages holding them
+    gc.collect()
+    gc.freeze()
+
+
+def _configure_logging():
+    # Only the supervisor's own logger: touching the root logger would make
+    # httpx and every other library log each request in every worker
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(asctime)s [%(process)d] %(name)s: %(message)s"))
+        logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(app: Any, sock: socket.socket, log_level: str) -> int:
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    try:
+        # uvicorn installs its own SIGTERM / SIGINT handlers for a graceful shutdown
+        uvicorn.Server(uvicorn.Config(app, log_level=log_level)).run(sockets=[sock])
+        return 0
+    except BaseException:
+        traceback.print_exc()
+        return 1
+
+
+def _spawn(app: Any, sock: socket.socket, log_level: str) -> int:
+    pid = os.fork()
+    if pid == 0:
+        code = 1
+        try:
+            code = _run_worker(app, sock, log_level)
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os._exit(code)
+    return pid
+
+
+def serve(app: Any, api: Any, host: str = "0.0.0.0", port: int = 8000, log_level: str = "info",
+          workers: int = None):
+    """Run app on host:port, pre-forking WEB_CONCURRENCY workers when it is above 1"""
+    workers = worker_count() if workers is None else workers
+    if workers <= 1 or not hasattr(os, "fork"):
+        uvicorn.run(app, host=host, port=port, log_level=log_level)
+        return
+
+    _configure_logging()
+    preload(api)
+    sock = bind_socket(host, port)
+    logger.info("Listening on %s:%d with %d workers", host, port, workers)
+
+    children: Dict[int, int] = {}
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for slot in range(workers):
+        children[_spawn(app, sock, log_level)] = slot
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        slot = children.pop(pid, None)
+        if slot is None or stopping:
+            continue
+        logger.warning("Worker %d exited with status %d; restarting", pid, os.waitstatus_to_exitcode(status))
+        time.sleep(RESTART_DELAY)
+        if not stopping:
+            children[_spawn(app, sock, log_level)] = slot
+
+    sock.close()
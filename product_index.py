@@ -0,0 +1,165 @@
+"""
+Local full-text search index over the Wild Kratts product catalog
+"""
+
+import math
+import re
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional, Tuple
+
+from episode_index import tokenize
+
+TAG_RE = re.compile(r'<[^>]*>')
+
+# Field weights applied to term frequencies (a simple BM25F)
+FIELD_WEIGHTS = {
+    'title': 3.0,
+    'categories': 2.0,
+    'description': 1.0,
+    'retailers': 1.0,
+}
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Prefix expansions score lower than exact token matches and are capped per query token
+PREFIX_WEIGHT = 0.5
+MAX_PREFIX_EXPANSIONS = 50
+
+# The only product fields the tools return; the catalog asks upstream for just these
+PRODUCT_FIELDS = ('id', 'link', 'title', 'description', 'featured_image', 'product_categories', 'retailers')
+
+
+def strip_html(html: Any) -> str:
+    return TAG_RE.sub('', html) if isinstance(html, str) else ''
+
+
+def rendered(value: Any) -> str:
+    """Return the rendered text of a WordPress field that may be a string or {'rendered': ...}"""
+    if isinstance(value, dict):
+        return value.get('rendered', '') or ''
+    return value if isinstance(value, str) else ''
+
+
+def text_values(value: Any) -> List[str]:
+    """Flatten category / retailer values (strings, lists or dicts with a name) into strings"""
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, dict):
+        return [str(value[key]) for key in ('name', 'title', 'slug') if value.get(key)]
+    if isinstance(value, list):
+        return [text for item in value for text in text_values(item)]
+    return []
+
+
+def simplify_product(product: Dict[str, Any]) -> Dict[str, Any]:
+    """Keep only the product fields the tools return"""
+    return {field: product.get(field) for field in PRODUCT_FIELDS}
+
+
+def select_fields(products: List[Dict[str, Any]], fields: Optional[List[str]]) -> List[Dict[str, Any]]:
+    """Project products onto the requested fields; unknown names are ignored"""
+    valid_requested_fields = [field for field in fields or [] if field in PRODUCT_FIELDS]
+    if not valid_requested_fields:
+        return products
+    return [{field: product.get(field) for field in valid_requested_fields} for product in products]
+
+
+class ProductIndex:
+    """Inverted index over title, description, categories and retailers with BM25 ranking"""
+
+    def __init__(self, products: List[Dict[str, Any]]):
+        self.products = [simplify_product(product) for product in products]
+        self.categories_lower = [
+            [category.lower() for category in text_values(product.get('product_categories'))]
+            for product in products
+        ]
+        self.postings: Dict[str, Dict[int, float]] = {}
+        self.doc_lengths: List[float] = []
+
+        for doc_id, product in enumerate(products):
+            fields = {
+                'title': tokenize(rendered(product.get('title'))),
+                'description': tokenize(strip_html(rendered(product.get('description')))),
+                'categories': tokenize(' '.join(text_values(product.get('product_categories')))),
+                'retailers': tokenize(' '.join(text_values(product.get('retailers')))),
+            }
+            length = 0.0
+            for field, tokens in fields.items():
+                weight = FIELD_WEIGHTS[field]
+                length += weight * len(tokens)
+                for token in tokens:
+                    doc_postings = self.postings.setdefault(token, {})
+                    doc_postings[doc_id] = doc_postings.get(doc_id, 0.0) + weight
+            self.doc_lengths.append(length)
+
+        self.vocabulary = sorted(self.postings)
+        self.average_length = (sum(self.doc_lengths) / len(self.doc_lengths)) if self.doc_lengths else 0.0
+        total = len(self.products)
+        self.idf = {
+            term: math.log(1 + (total - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in self.postings.items()
+        }
+
+    def in_category(self, doc_id: int, category: str) -> bool:
+        category_lower = category.lower()
+        return any(category_lower in cat for cat in self.categories_lower[doc_id])
+
+    def filter(self, category: str = None) -> List[Dict[str, Any]]:
+        """Return every product in catalog order, optionally filtered by category"""
+        if not category:
+            return list(self.products)
+        return [product for doc_id, product in enumerate(self.products) if self.in_category(doc_id, category)]
+
+    def _expand(self, token: str) -> List[Tuple[str, float]]:
+        """Return (term, weight) pairs for an exact match plus vocabulary terms sharing the prefix"""
+        matches = []
+        if token in self.postings:
+            matches.append((token, 1.0))
+        position = bisect_left(self.vocabulary, token)
+        while position < len(self.vocabulary) and len(matches) < MAX_PREFIX_EXPANSIONS:
+            term = self.vocabulary[position]
+            if not term.startswith(token):
+                break
+            if term != token:
+                matches.append((term, PREFIX_WEIGHT))
+            position += 1
+        return matches
+
+    def _score_token(self, token: str) -> Dict[int, float]:
+        """Best BM25 contribution per document for one query token"""
+        scores: Dict[int, float] = {}
+        average_length = self.average_length or 1.0
+        for term, weight in self._expand(token):
+            idf = self.idf[term]
+            for doc_id, tf in self.postings[term].items():
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_lengths[doc_id] / average_length)
+                score = weight * idf * tf * (BM25_K1 + 1) / (tf + norm)
+                if score > scores.get(doc_id, 0.0):
+                    scores[doc_id] = score
+        return scores
+
+    def search(self, query: str, category: str = None) -> List[Dict[str, Any]]:
+        """Return products matching every query token (exactly or by prefix), most relevant first"""
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return []
+
+        totals: Dict[int, float] = {}
+        for position, token in enumerate(tokens):
+            token_scores = self._score_token(token)
+            if position == 0:
+                totals = token_scores
+            else:
+                totals = {doc_id: score + token_scores[doc_id]
+                          for doc_id, score in totals.items() if doc_id in token_scores}
+            if not totals:
+                return []
+
+        if category:
+            totals = {doc_id: score for doc_id, score in totals.items()
+                      if self.in_category(doc_id, category)}
+
+        # Highest score first; ties keep catalog order
+        ranked = sorted(totals, key=lambda doc_id: (-totals[doc_id], doc_id))
+        return [self.products[doc_id] for doc_id in ranked]
@@ -0,0 +1,81 @@
+"""
+Progress reporting from long-running work back to a streaming /mcp response
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional, Set
+
+ProgressSender = Callable[[float, Optional[float], str, Optional[List[Dict[str, Any]]]], None]
+PartialFilter = Callable[[List[Dict[str, Any]]], List[Dict[str, Any]]]
+
+
+class ProgressReporter:
+    """Forwards progress (and optional partial results) for the request it is bound to"""
+
+    def __init__(self, send: ProgressSender):
+        self.send = send
+        self.partial_filter: Optional[PartialFilter] = None
+
+
+_current: ContextVar[Optional[ProgressReporter]] = ContextVar("progress_reporter", default=None)
+
+# The shared work (e.g. a catalog crawl) the current task is doing, if any
+_channel: ContextVar[Optional["ProgressChannel"]] = ContextVar("progress_channel", default=None)
+
+
+class ProgressChannel:
+    """Progress of one piece of shared work, forwarded only to the requests waiting on it"""
+
+    def __init__(self):
+        self.listeners: Set[ProgressReporter] = set()
+
+    @contextmanager
+    def waiting(self):
+        """Forward this work's progress to the current request for as long as it waits on it"""
+        reporter = _current.get()
+        if reporter is not None:
+            self.listeners.add(reporter)
+        try:
+            yield
+        finally:
+            self.listeners.discard(reporter)
+
+    @contextmanager
+    def reporting(self):
+        """Route report_progress calls made by the current task, which does the work, to this channel"""
+        token = _channel.set(self)
+        try:
+            yield
+        finally:
+            _channel.reset(token)
+
+
+@contextmanager
+def progress_reporting(send: ProgressSender):
+    """Route progress of any work the current request waits on to send"""
+    token = _current.set(ProgressReporter(send))
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def set_partial_filter(partial_filter: PartialFilter):
+    """Turn raw items passed to report_progress into partial results for the current request"""
+    reporter = _current.get()
+    if reporter is not None:
+        reporter.partial_filter = partial_filter
+
+
+def report_progress(progress: float, total: Optional[float], message: str,
+                    items: Optional[List[Dict[str, Any]]] = None):
+    """Report progress of the current work to the requests waiting on it, if any"""
+    channel = _channel.get()
+    if channel is None:
+        return
+    for reporter in list(channel.listeners):
+        partial = None
+        if items is not None and reporter.partial_filter is not None:
+            partial = reporter.partial_filter(items)
+        reporter.send(progress, total, message, partial)
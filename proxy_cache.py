@@ -0,0 +1,165 @@
+"""
+Optional on-disk response cache for the stdio MCP proxies
+
+Successful tools/list and tools/call responses are stored in a small SQLite
+database keyed by method, tool name and normalized arguments. Each tool has
+its own TTL, and the least recently used entries are evicted once the cache
+grows past its size limit. Repeated agent queries are then answered locally
+without a round trip to the remote server.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from typing import Any, Dict, Optional
+
+# Off unless MCP_PROXY_CACHE is set to 1/true/on
+CACHE_ENABLED = os.environ.get("MCP_PROXY_CACHE", "").lower() in ("1", "true", "yes", "on")
+CACHE_DIR = os.environ.get("MCP_PROXY_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "wild-kratts-mcp"))
+CACHE_MAX_BYTES = int(os.environ.get("MCP_PROXY_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+
+# Seconds a response stays fresh, by tool name ("tools/list" for the tool list itself)
+DEFAULT_TTLS = {
+    "tools/list": 3600,
+    "get_wild_kratts_episodes": 3600,
+    "get_wild_kratts_products": 900,
+    "view_location_google_maps": 86400,
+    "search_google_maps": 86400,
+    "directions_on_google_maps": 86400,
+}
+DEFAULT_TTL = 300
+
+
+def parse_ttls(spec: str) -> Dict[str, float]:
+    """Parse TTL overrides such as "get_wild_kratts_products=60,tools/list=0" (0 disables caching)"""
+    ttls = {}
+    for entry in spec.split(","):
+        name, _, seconds = entry.partition("=")
+        if name.strip() and seconds.strip():
+            ttls[name.strip()] = float(seconds)
+    return ttls
+
+
+def normalize(value: Any) -> Any:
+    """Drop null arguments and surrounding whitespace so equivalent calls share an entry"""
+    if isinstance(value, dict):
+        return {key: normalize(item) for key, item in value.items() if item is not None}
+    if isinstance(value, list):
+        return [normalize(item) for item in value]
+    if isinstance(value, str):
+        return value.strip()
+    return value
+
+
+def cache_key(request: Dict[str, Any]) -> Optional[str]:
+    """Key a tools/list or tools/call request; None for anything that is not cacheable"""
+    method = request.get("method")
+    params = request.get("params") or {}
+    if method == "tools/list":
+        parts = [method]
+    elif method == "tools/call":
+        parts = [method, params.get("name"), normalize(params.get("arguments") or {})]
+    else:
+        return None
+    encoded = json.dumps(parts, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+def is_success(response: Dict[str, Any]) -> bool:
+    """True for a complete, current JSON-RPC result: not a tool error, nor flagged partial or stale"""
+    result = response.get("result")
+    if not isinstance(result, dict) or result.get("isError"):
+        return False
+    # The Wild Kratts tools report failures as {"error": ...} inside the text
+    # content, and degraded answers as {"partial": true} or {"stale": true}; those
+    # must not outlive the upstream outage that produced them
+    for content in result.get("content") or []:
+        text = content.get("text") if isinstance(content, dict) else None
+        if text and text.lstrip().startswith("{"):
+            try:
+                decoded = json.loads(text)
+            except ValueError:
+                continue
+            if isinstance(decoded, dict) and ("error" in decoded or decoded.get("partial") or decoded.get("stale")):
+                return False
+    return True
+
+
+class ProxyCache:
+    """Size-bounded LRU of JSON-RPC results, persisted in SQLite"""
+
+    def __init__(self, directory: str = CACHE_DIR, max_bytes: int = CACHE_MAX_BYTES,
+                 ttls: Optional[Dict[str, float]] = None):
+        self.max_bytes = max_bytes
+        self.ttls = dict(DEFAULT_TTLS)
+        self.ttls.update(parse_ttls(os.environ.get("MCP_PROXY_CACHE_TTLS", "")))
+        self.ttls.update(ttls or {})
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, "responses.sqlite3")
+        self.conn = sqlite3.connect(self.path, timeout=5)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, expires_at REAL NOT NULL, used_at REAL NOT NULL, "
+            "size INTEGER NOT NULL, result BLOB NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS responses_used_at ON responses (used_at)")
+
+    def ttl(self, request: Dict[str, Any]) -> float:
+        if request.get("method") == "tools/list":
+            return self.ttls.get("tools/list", DEFAULT_TTL)
+        name = (request.get("params") or {}).get("name")
+        return self.ttls.get(name, DEFAULT_TTL)
+
+    def get(self, request: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Return a cached response carrying this request's id, or None on a miss"""
+        key = cache_key(request)
+        if key is None:
+            return None
+        now = time.time()
+        row = self.conn.execute(
+            "SELECT result FROM responses WHERE key = ? AND expires_at > ?", (key, now)
+        ).fetchone()
+        if row is None:
+            return None
+        with self.conn:
+            self.conn.execute("UPDATE responses SET used_at = ? WHERE key = ?", (now, key))
+        return {"jsonrpc": "2.0", "id": request.get("id"), "result": json.loads(row[0])}
+
+    def put(self, request: Dict[str, Any], response: Dict[str, Any]):
+        """Store a successful response, then evict least recently used entries over the size limit"""
+        key = cache_key(request)
+        ttl = self.ttl(request)
+        if key is None or ttl <= 0 or not is_success(response):
+            return
+        result = json.dumps(response["result"], separators=(",", ":"), ensure_ascii=False).encode()
+        if len(result) > self.max_bytes:
+            return
+        now = time.time()
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (key, expires_at, used_at, size, result) VALUES (?, ?, ?, ?, ?)",
+                (key, now + ttl, now, len(result), result)
+            )
+            self.conn.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+            self._evict()
+
+    def _evict(self):
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self.conn.execute("SELECT key, size FROM responses ORDER BY used_at").fetchall():
+            self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def close(self):
+        self.conn.close()
+
+
+def open_cache() -> Optional[ProxyCache]:
+    """The proxy cache if MCP_PROXY_CACHE enables it, otherwise None"""
+    return ProxyCache() if CACHE_ENABLED else None
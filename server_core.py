@@ -0,0 +1,331 @@
+"""
+Shared core of the HTTP servers: app factory, lifespan, middleware stack and MCP dispatch
+
+Each server module builds its app with create_app(), choosing the response
+profile, the tools it advertises on /mcp and its /tools summary, then adds
+whatever extra routes it needs (root, health, test endpoints).
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import Response
+
+from admission import AdmissionMiddleware
+from compression import CompressionMiddleware
+from fastjson import FastJSONResponse, dumps_text
+from gazetteer import gazetteer, search_places, view_location
+from jsonrpc import (CachedJSON, INTERNAL_ERROR, INVALID_REQUEST, METHOD_NOT_FOUND, PARSE_ERROR, handle_rpc_batch,
+                     rpc_error, stream_rpc, wants_event_stream)
+from metrics import MetricsMiddleware, loop_lag_monitor, metrics_response, timed_rpc
+from upstream import upstream
+from wild_kratts_api import PROFILE_PARAMETER, WildKrattsAPI
+
+SERVER_NAME = "wild-kratts-mcp-server"
+SERVER_VERSION = "1.0.0"
+PROTOCOL_VERSION = "2024-11-05"
+
+# Tool schemas advertised by the full servers (server_http.py, server_railway.py)
+TOOLS = [
+    {
+        "name": "view_location_google_maps",
+        "description": "View a specific geographical location",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "query": {"type": "string", "description": "Location to view (a place name or \"lat,lon\")"}
+            },
+            "required": ["query"]
+        }
+    },
+    {
+        "name": "search_google_maps",
+        "description": "Search for places near a location",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "search": {"type": "string",
+                           "description": "A place, or a kind of place near / in one (e.g. \"parks near Denver\")"},
+                "limit": {"type": "integer", "description": "Maximum places to return", "default": 10},
+                "radiusKm": {"type": "number", "description": "Only return places within this distance"}
+            },
+            "required": ["search"]
+        }
+    },
+    {
+        "name": "directions_on_google_maps",
+        "description": "Get directions from origin to destination",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "origin": {"type": "string", "description": "Starting location"},
+                "destination": {"type": "string", "description": "Destination"}
+            },
+            "required": ["origin", "destination"]
+        }
+    },
+    {
+        "name": "get_wild_kratts_products",
+        "description": "Fetch Wild Kratts products",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "searchTerm": {"type": "string", "description": "Search term"},
+                "category": {"type": "string", "description": "Category filter"},
+                "page": {"type": "integer", "description": "Page number", "default": 1},
+                "fields": {"type": "array", "items": {"type": "string"}},
+                "cursor": {"type": "string", "description": "nextCursor from a previous page"},
+                "profile": PROFILE_PARAMETER
+            }
+        }
+    },
+    {
+        "name": "get_wild_kratts_episodes",
+        "description": "Fetch Wild Kratts episodes",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "seasonNumber": {"type": "integer", "description": "Season number"},
+                "episodeTitle": {"type": "string", "description": "Episode title"},
+                "animalsFeatured": {"type": "array", "items": {"type": "string"}},
+                "fields": {"type": "array", "items": {"type": "string"}},
+                "airDateFrom": {"type": "string", "description": "Earliest air date (YYYY-MM-DD)"},
+                "airDateTo": {"type": "string", "description": "Latest air date (YYYY-MM-DD)"},
+                "episodeNumberFrom": {"type": "integer", "description": "Lowest broadcast episode number"},
+                "episodeNumberTo": {"type": "integer", "description": "Highest broadcast episode number"},
+                "limit": {"type": "integer", "description": "Episodes per page; enables pagination"},
+                "cursor": {"type": "string", "description": "nextCursor from a previous page"},
+                "profile": PROFILE_PARAMETER
+            }
+        }
+    }
+]
+
+TOOL_SUMMARIES = {"tools": [
+    {
+        "name": "view_location_google_maps",
+        "description": "View a specific geographical location",
+        "parameters": ["query"]
+    },
+    {
+        "name": "search_google_maps",
+        "description": "Search for places near a location",
+        "parameters": ["search", "limit", "radiusKm"]
+    },
+    {
+        "name": "directions_on_google_maps",
+        "description": "Get directions from origin to destination",
+        "parameters": ["origin", "destination"]
+    },
+    {
+        "name": "get_wild_kratts_products",
+        "description": "Fetch Wild Kratts products with search and filtering",
+        "parameters": ["searchTerm", "category", "page", "fields", "cursor", "profile"]
+    },
+    {
+        "name": "get_wild_kratts_episodes",
+        "description": "Fetch Wild Kratts episodes with filtering options",
+        "parameters": ["seasonNumber", "episodeTitle", "animalsFeatured", "fields",
+                       "airDateFrom", "airDateTo", "episodeNumberFrom", "episodeNumberTo",
+                       "limit", "cursor", "profile"]
+    }
+]}
+
+ToolHandler = Callable[[WildKrattsAPI, Dict[str, Any]], Awaitable[Any]]
+
+
+async def _view_location(api: WildKrattsAPI, arguments: Dict[str, Any]) -> Any:
+    return view_location(arguments.get("query", ""))
+
+
+async def _search_places(api: WildKrattsAPI, arguments: Dict[str, Any]) -> Any:
+    return search_places(arguments.get("search", ""), arguments.get("limit"), arguments.get("radiusKm"))
+
+
+async def _directions(api: WildKrattsAPI, arguments: Dict[str, Any]) -> Any:
+    origin = arguments.get("origin", "")
+    destination = arguments.get("destination", "")
+    return f"Directions from {origin} to {destination} would be processed."
+
+
+async def _get_products(api: WildKrattsAPI, arguments: Dict[str, Any]) -> Any:
+    return await api.get_products(
+        arguments.get("searchTerm"),
+        arguments.get("category"),
+        arguments.get("page", 1),
+        arguments.get("fields"),
+        arguments.get("cursor"),
+        arguments.get("profile")
+    )
+
+
+async def _get_episodes(api: WildKrattsAPI, arguments: Dict[str, Any]) -> Any:
+    return await api.get_episodes(
+        arguments.get("seasonNumber"),
+        arguments.get("episodeTitle"),
+        arguments.get("animalsFeatured"),
+        arguments.get("fields"),
+        arguments.get("airDateFrom"),
+        arguments.get("airDateTo"),
+        arguments.get("episodeNumberFrom"),
+        arguments.get("episodeNumberTo"),
+        arguments.get("limit"),
+        arguments.get("cursor"),
+        arguments.get("profile")
+    )
+
+
+TOOL_HANDLERS: Dict[str, ToolHandler] = {
+    "view_location_google_maps": _view_location,
+    "search_google_maps": _search_places,
+    "directions_on_google_maps": _directions,
+    "get_wild_kratts_products": _get_products,
+    "get_wild_kratts_episodes": _get_episodes,
+}
+
+MAPS_TOOLS = ("view_location_google_maps", "search_google_maps", "directions_on_google_maps")
+
+
+def lifespan(api: WildKrattsAPI, load_gazetteer: bool = True):
+    """Own the shared upstream client and catalog caches for the lifetime of the app"""
+
+    @asynccontextmanager
+    async def run(app: FastAPI):
+        async with upstream, loop_lag_monitor:
+            # Serve from the on-disk snapshot right away; refresh in the background if needed
+            await api.episode_catalog.preload()
+            await api.product_catalog.preload()
+            if load_gazetteer:
+                # Build the offline gazetteer's name and spatial indexes off the event loop
+                await asyncio.to_thread(gazetteer.load)
+            yield
+            await api.episode_catalog.close()
+            await api.product_catalog.close()
+
+    return run
+
+
+def rpc_handler(api: WildKrattsAPI, tools: List[Dict[str, Any]], tools_list: CachedJSON):
+    """A single-message MCP JSON-RPC handler serving the given tools"""
+    handlers = {tool["name"]: TOOL_HANDLERS[tool["name"]] for tool in tools}
+
+    @timed_rpc
+    async def handle_rpc(body: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        method = body.get("method")
+        params = body.get("params") or {}
+        request_id = body.get("id")
+
+        if method == "initialize":
+            return {
+                "jsonrpc": "2.0",
+                "id": request_id,
+                "result": {
+                    "protocolVersion": PROTOCOL_VERSION,
+                    "capabilities": {"tools": {}},
+                    "serverInfo": {"name": SERVER_NAME, "version": SERVER_VERSION}
+                }
+            }
+        if method == "notifications/initialized":
+            return None
+        if method == "tools/list":
+            return {"jsonrpc": "2.0", "id": request_id, "result": tools_list.payload}
+        if method != "tools/call":
+            return rpc_error(request_id, METHOD_NOT_FOUND, f"Unknown method: {method}")
+
+        name = params.get("name")
+        handler = handlers.get(name)
+        if handler is None:
+            return rpc_error(request_id, METHOD_NOT_FOUND, f"Unknown tool: {name}")
+        result = await handler(api, params.get("arguments") or {})
+        text = result if isinstance(result, str) else dumps_text(result)
+        return {"jsonrpc": "2.0", "id": request_id, "result": {"content": [{"type": "text", "text": text}]}}
+
+    return handle_rpc
+
+
+def create_app(api: WildKrattsAPI, description: str, tool_summaries: Dict[str, Any],
+               tools: Optional[List[Dict[str, Any]]] = None) -> FastAPI:
+    """Build a server app with the shared middleware, /metrics, /tools, REST and (given tools) /mcp routes"""
+    app = FastAPI(
+        title="Wild Kratts MCP Server",
+        description=description,
+        version=SERVER_VERSION,
+        lifespan=lifespan(api, load_gazetteer=any(tool["name"] in MAPS_TOOLS for tool in tools or ()))
+    )
+    # Admission runs inside the metrics middleware so rejected requests are still measured,
+    # and compression sits between them so its cost shows up in request latency
+    app.add_middleware(AdmissionMiddleware)
+    app.add_middleware(CompressionMiddleware)
+    app.add_middleware(MetricsMiddleware)
+
+    # Tool metadata is encoded once; /tools and tools/list are served from these bytes
+    summaries = CachedJSON(tool_summaries)
+
+    @app.get("/metrics")
+    async def metrics():
+        """Prometheus metrics"""
+        return metrics_response()
+
+    @app.get("/tools")
+    async def list_tools(request: Request):
+        """List available tools"""
+        return summaries.response(request)
+
+    @app.get("/products")
+    async def get_products(searchTerm: str = None, category: str = None, page: int = 1,
+                           fields: str = None, cursor: str = None, profile: str = None):
+        """Get Wild Kratts products"""
+        fields_list = fields.split(',') if fields else None
+        result = await api.get_products(searchTerm, category, page, fields_list, cursor, profile)
+        return FastJSONResponse(result)
+
+    @app.get("/episodes")
+    async def get_episodes(seasonNumber: int = None, episodeTitle: str = None,
+                           animalsFeatured: str = None, fields: str = None,
+                           airDateFrom: str = None, airDateTo: str = None,
+                           episodeNumberFrom: int = None, episodeNumberTo: int = None,
+                           limit: int = None, cursor: str = None, profile: str = None):
+        """Get Wild Kratts episodes"""
+        # Parse comma-separated strings to lists
+        animals_list = animalsFeatured.split(',') if animalsFeatured else None
+        fields_list = fields.split(',') if fields else None
+        result = await api.get_episodes(seasonNumber, episodeTitle, animals_list, fields_list,
+                                        airDateFrom, airDateTo, episodeNumberFrom, episodeNumberTo,
+                                        limit, cursor, profile)
+        return FastJSONResponse(result)
+
+    if tools is None:
+        return app
+
+    tools_list = CachedJSON({"tools": tools})
+    handle_rpc = rpc_handler(api, tools, tools_list)
+
+    @app.post("/mcp")
+    async def handle_mcp_request(request: Request):
+        """Handle MCP protocol requests via HTTP (single messages, JSON-RPC batches or SSE streams)"""
+        try:
+            body = await request.json()
+        except ValueError:
+            return FastJSONResponse(rpc_error(None, PARSE_ERROR, "Parse error"), status_code=400)
+
+        if isinstance(body, list):
+            return await handle_rpc_batch(body, handle_rpc)
+        if not isinstance(body, dict):
+            return FastJSONResponse(rpc_error(None, INVALID_REQUEST, "Invalid Request"), status_code=400)
+
+        try:
+            if body.get("method") == "tools/list":
+                return tools_list.rpc_response(request, body.get("id"))
+            if wants_event_stream(request, body):
+                return stream_rpc(body, handle_rpc)
+            response = await handle_rpc(body)
+            if response is None or "id" not in body:
+                # Notifications are executed but never answered
+                return Response(status_code=202)
+            return FastJSONResponse(response)
+        except Exception as e:
+            return FastJSONResponse(rpc_error(body.get("id"), INTERNAL_ERROR, str(e)), status_code=500)
+
+    return app
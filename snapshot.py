@@ -0,0 +1,150 @@
+"""
+Persistent catalog snapshots in a local SQLite database
+
+The sync worker and web processes share one database file. Each catalog is
+stored as a single compact JSON blob with the time it was synced, so a
+cold-started process can load it in milliseconds and decide whether it
+still needs refreshing. Refresh leases in the same file make sure only one
+of the processes sharing it crawls upstream at a time.
+"""
+
+import os
+import socket
+import sqlite3
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastjson import dumps
+
+try:
+    import orjson
+    loads = orjson.loads
+except ImportError:  # orjson is an optional speedup
+    import json
+    loads = json.loads
+
+# Directory shared by every process that reads or writes snapshots
+SNAPSHOT_DIR = os.environ.get("CATALOG_SNAPSHOT_DIR", "snapshot")
+SNAPSHOT_DB = "catalog.sqlite3"
+
+
+def snapshot_path() -> str:
+    return os.path.join(SNAPSHOT_DIR, SNAPSHOT_DB)
+
+
+def _connect() -> sqlite3.Connection:
+    os.makedirs(SNAPSHOT_DIR or ".", exist_ok=True)
+    conn = sqlite3.connect(snapshot_path(), timeout=30)
+    # WAL lets readers keep serving the previous snapshot while a writer replaces it
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS snapshots ("
+        "name TEXT PRIMARY KEY, synced_at REAL NOT NULL, items BLOB NOT NULL, version REAL)"
+    )
+    if "version" not in {row[1] for row in conn.execute("PRAGMA table_info(snapshots)")}:
+        # Databases written before snapshots carried a content version; theirs is their sync time
+        conn.execute("ALTER TABLE snapshots ADD COLUMN version REAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS refresh_leases ("
+        "name TEXT PRIMARY KEY, holder TEXT NOT NULL, expires_at REAL NOT NULL)"
+    )
+    return conn
+
+
+def lease_holder() -> str:
+    # Evaluated per call: forked workers share the module but not the pid
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def acquire_refresh_lease(name: str, ttl: float) -> bool:
+    """Claim the right to refresh a catalog for ttl seconds; False while another process holds it"""
+    now = time.time()
+    conn = _connect()
+    try:
+        with conn:
+            # A single upsert, so two processes can never both see the lease as free
+            cursor = conn.execute(
+                "INSERT INTO refresh_leases (name, holder, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET holder = excluded.holder, expires_at = excluded.expires_at "
+                "WHERE refresh_leases.expires_at < ? OR refresh_leases.holder = excluded.holder",
+                (name, lease_holder(), now + ttl, now)
+            )
+            return cursor.rowcount == 1
+    finally:
+        conn.close()
+
+
+def release_refresh_lease(name: str):
+    conn = _connect()
+    try:
+        with conn:
+            conn.execute("DELETE FROM refresh_leases WHERE name = ? AND holder = ?", (name, lease_holder()))
+    finally:
+        conn.close()
+
+
+def refresh_lease_active(name: str) -> bool:
+    """True while some process holds an unexpired refresh lease on a catalog"""
+    conn = _connect()
+    try:
+        row = conn.execute("SELECT expires_at FROM refresh_leases WHERE name = ?", (name,)).fetchone()
+        return row is not None and row[0] >= time.time()
+    finally:
+        conn.close()
+
+
+def snapshot_synced_at(name: str) -> Optional[float]:
+    """Return when a snapshot was last synced (epoch seconds), or None if there is none"""
+    stamp = snapshot_stamp(name)
+    return stamp[0] if stamp else None
+
+
+def snapshot_stamp(name: str) -> Optional[Tuple[float, float]]:
+    """Return (synced_at, version) for a snapshot without reading its items, or None if there is none"""
+    if not os.path.exists(snapshot_path()):
+        return None
+    conn = _connect()
+    try:
+        return conn.execute(
+            "SELECT synced_at, COALESCE(version, synced_at) FROM snapshots WHERE name = ?", (name,)
+        ).fetchone()
+    finally:
+        conn.close()
+
+
+def read_snapshot(name: str) -> Optional[Dict[str, Any]]:
+    """Return {'synced_at', 'version', 'items'} for a snapshot, or None if there is none"""
+    if not os.path.exists(snapshot_path()):
+        return None
+    conn = _connect()
+    try:
+        row = conn.execute(
+            "SELECT synced_at, COALESCE(version, synced_at), items FROM snapshots WHERE name = ?", (name,)
+        ).fetchone()
+    finally:
+        conn.close()
+    if row is None:
+        return None
+    return {"synced_at": row[0], "version": row[1], "items": loads(row[2])}
+
+
+def write_snapshot(name: str, items: List[Dict[str, Any]], synced_at: float = None,
+                   version: float = None) -> float:
+    """Atomically replace a snapshot; returns its synced_at.
+
+    version identifies the content for pagination cursors. It defaults to
+    synced_at; pass the previous version when a refresh found nothing changed,
+    so every process loading the snapshot keeps honouring the same cursors.
+    """
+    synced_at = time.time() if synced_at is None else synced_at
+    version = synced_at if version is None else version
+    conn = _connect()
+    try:
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO snapshots (name, synced_at, items, version) VALUES (?, ?, ?, ?)",
+                (name, synced_at, dumps(items), version)
+            )
+    finally:
+        conn.close()
+    return synced_at
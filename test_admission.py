@@ -0,0 +1,144 @@
+"""
+Tests for admission control: token buckets, sessions and the concurrency queue
+"""
+
+import asyncio
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from admission import (AdmissionController, AdmissionMiddleware, Rejected, TokenBucket, mint_session,
+                       valid_session)
+from jsonrpc import INVALID_REQUEST, RATE_LIMITED, SERVER_OVERLOADED
+
+
+def make_client(controller, initialize_fails=False):
+    app = FastAPI()
+
+    @app.post("/mcp")
+    async def mcp(request: Request):
+        body = await request.json()
+        if isinstance(body, list):
+            return [{"jsonrpc": "2.0", "id": message.get("id"), "result": {}} for message in body]
+        if body.get("method") == "initialize" and initialize_fails:
+            return {"jsonrpc": "2.0", "id": body.get("id"), "error": {"code": -32603, "message": "failed"}}
+        return {"jsonrpc": "2.0", "id": body.get("id"), "result": {}}
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    app.add_middleware(AdmissionMiddleware, controller=controller)
+    return TestClient(app)
+
+
+def rpc(method, request_id=1):
+    return {"jsonrpc": "2.0", "id": request_id, "method": method}
+
+
+def test_token_bucket_spends_burst_then_reports_the_wait():
+    bucket = TokenBucket(rate=2, burst=3)
+    assert bucket.take(3) == 0
+    assert bucket.take(1) == pytest.approx(0.5, abs=0.01)
+
+
+def test_client_over_its_rate_gets_429_with_retry_after():
+    client = make_client(AdmissionController(rate=0.01, burst=2))
+    assert client.post("/mcp", json=rpc("tools/list")).status_code == 200
+    assert client.post("/mcp", json=rpc("tools/list")).status_code == 200
+
+    response = client.post("/mcp", json=rpc("tools/list"))
+    assert response.status_code == 429
+    assert response.json()["error"]["code"] == RATE_LIMITED
+    assert int(response.headers["retry-after"]) >= 1
+    # Routes outside the tool endpoints are never admitted
+    assert client.get("/health").status_code == 200
+
+
+def test_batch_is_charged_per_message():
+    client = make_client(AdmissionController(rate=0.01, burst=4))
+    assert client.post("/mcp", json=[rpc("tools/list", n) for n in range(3)]).status_code == 200
+    assert client.post("/mcp", json=[rpc("tools/list", n) for n in range(2)]).status_code == 429
+
+
+def test_batch_larger_than_the_burst_is_refused_without_charging():
+    client = make_client(AdmissionController(rate=0.01, burst=4))
+    response = client.post("/mcp", json=[rpc("tools/list", n) for n in range(5)])
+    assert response.status_code == 400
+    assert response.json()["error"]["code"] == INVALID_REQUEST
+    assert "retry-after" not in response.headers
+    # The refused batch spent nothing, so a full-burst batch still fits
+    assert client.post("/mcp", json=[rpc("tools/list", n) for n in range(4)]).status_code == 200
+
+
+def test_session_is_issued_only_on_a_successful_initialize():
+    response = make_client(AdmissionController()).post("/mcp", json=rpc("initialize"))
+    assert valid_session(response.headers["mcp-session-id"])
+
+    failed = make_client(AdmissionController(), initialize_fails=True).post("/mcp", json=rpc("initialize"))
+    assert failed.status_code == 200
+    assert "mcp-session-id" not in failed.headers
+
+
+def test_new_sessions_do_not_reset_the_address_limit():
+    client = make_client(AdmissionController(rate=0.01, burst=3))
+    sessions = [client.post("/mcp", json=rpc("initialize")).headers["mcp-session-id"] for _ in range(2)]
+    assert client.post("/mcp", json=rpc("tools/list"), headers={"Mcp-Session-Id": sessions[1]}).status_code == 200
+    # Every token of the address is spent; neither a new nor an old session gets around that
+    assert client.post("/mcp", json=rpc("initialize")).status_code == 429
+    assert client.post("/mcp", json=rpc("tools/list"), headers={"Mcp-Session-Id": sessions[0]}).status_code == 429
+
+
+def test_forged_session_ids_are_ignored():
+    assert valid_session(mint_session())
+    nonce = mint_session().partition(".")[0]
+    assert not valid_session(f"{nonce}.{'0' * 32}")
+    assert not valid_session("no-signature")
+
+
+def test_queue_grants_slots_in_arrival_order():
+    async def scenario():
+        controller = AdmissionController(rate=0, max_concurrent=2, queue_size=4, queue_timeout=1)
+        await controller.acquire(2)
+        order = []
+
+        async def request(name, slots):
+            await controller.acquire(slots)
+            order.append(name)
+            controller.release(slots)
+
+        tasks = [asyncio.create_task(request("batch", 2)), asyncio.create_task(request("single", 1))]
+        await asyncio.sleep(0)
+        assert controller.waiting == 2
+        controller.release(2)
+        await asyncio.gather(*tasks)
+        return order, controller.active
+
+    # The single request, although it would fit first, does not jump the queued batch
+    assert asyncio.run(scenario()) == (["batch", "single"], 0)
+
+
+def test_full_queue_sheds_and_queue_timeout_rejects():
+    async def scenario():
+        controller = AdmissionController(rate=0, max_concurrent=1, queue_size=1, queue_timeout=0.05)
+        await controller.acquire()
+        queued = asyncio.create_task(controller.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(Rejected) as shed:
+            await controller.acquire()
+        with pytest.raises(Rejected) as timed_out:
+            await queued
+        return shed.value, timed_out.value, controller.waiting
+
+    shed, timed_out, waiting = asyncio.run(scenario())
+    assert shed.status == timed_out.status == 503
+    assert shed.code == SERVER_OVERLOADED
+    assert waiting == 0
+
+
+def test_a_batch_holds_at_most_every_slot():
+    controller = AdmissionController(max_concurrent=8)
+    assert controller.slots(1) == 1
+    assert controller.slots(5) == 5
+    assert controller.slots(50) == 8
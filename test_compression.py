@@ -0,0 +1,115 @@
+"""
+Tests for Accept-Encoding negotiation and the compression middleware
+"""
+
+import gzip
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import Response, StreamingResponse
+from fastapi.testclient import TestClient
+
+import compression
+from compression import CompressionMiddleware, negotiate
+
+BODY = b'{"products":[' + b",".join(b'{"id":%d,"title":"Cheetah Plush"}' % n for n in range(100)) + b']}'
+
+
+@pytest.fixture(autouse=True)
+def every_encoding(monkeypatch):
+    monkeypatch.setattr(compression, "AVAILABLE", ["zstd", "br", "gzip"])
+    monkeypatch.setattr(compression, "ENABLED", True)
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, None),
+    ("", None),
+    ("identity", None),
+    ("gzip", "gzip"),
+    ("gzip, deflate, br", "br"),
+    ("gzip, br, zstd", "zstd"),
+    ("zstd;q=0.5, gzip", "gzip"),
+    ("br;q=0, gzip;q=0.1", "gzip"),
+    ("*", "zstd"),
+    ("*;q=0.2, br;q=0", "zstd"),
+    ("gzip;q=bogus", None),
+    ("GZIP", "gzip"),
+])
+def test_negotiate_picks_the_best_accepted_encoding(header, expected):
+    assert negotiate(header) == expected
+
+
+def test_negotiate_skips_encodings_this_process_lacks(monkeypatch):
+    monkeypatch.setattr(compression, "AVAILABLE", ["gzip"])
+    assert negotiate("zstd, br") is None
+    assert negotiate("zstd, gzip;q=0.1") == "gzip"
+
+
+def test_compression_can_be_disabled(monkeypatch):
+    monkeypatch.setattr(compression, "ENABLED", False)
+    assert negotiate("gzip") is None
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+
+    @app.get("/large")
+    async def large():
+        return Response(BODY, media_type="application/json", headers={"ETag": '"abc"', "Vary": "Origin"})
+
+    @app.get("/small")
+    async def small():
+        return Response(b'{"ok":true}', media_type="application/json")
+
+    @app.get("/stream")
+    async def stream():
+        return StreamingResponse(iter([BODY, BODY]), media_type="application/json")
+
+    @app.get("/events")
+    async def events():
+        return Response(BODY, media_type="text/event-stream")
+
+    @app.get("/encoded")
+    async def encoded():
+        return Response(gzip.compress(BODY), media_type="application/json", headers={"Content-Encoding": "gzip"})
+
+    app.add_middleware(CompressionMiddleware, min_size=1024)
+    return TestClient(app)
+
+
+def test_large_json_is_compressed_with_weak_etag_and_vary(client):
+    response = client.get("/large", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["etag"] == 'W/"abc"'
+    assert response.headers["vary"] == "Origin, Accept-Encoding"
+    assert int(response.headers["content-length"]) < len(BODY)
+    assert response.content == BODY
+
+
+@pytest.mark.parametrize("encoding", ["zstd", "br"])
+def test_optional_codecs_round_trip(client, encoding):
+    if encoding not in compression.available_encodings():
+        pytest.skip(f"{encoding} codec not installed")
+    response = client.get("/large", headers={"Accept-Encoding": encoding})
+    assert response.headers["content-encoding"] == encoding
+    assert int(response.headers["content-length"]) < len(BODY)
+    assert response.content == BODY
+
+
+@pytest.mark.parametrize("path", ["/small", "/stream", "/events"])
+def test_small_streamed_and_event_stream_bodies_pass_through(client, path):
+    response = client.get(path, headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+
+
+def test_already_encoded_body_is_not_compressed_again(client):
+    response = client.get("/encoded", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.content == BODY
+
+
+def test_identity_clients_get_the_original_headers(client):
+    response = client.get("/large", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in response.headers
+    assert response.headers["etag"] == '"abc"'
@@ -0,0 +1,167 @@
+"""
+Tests for pagination cursors and CachedCatalog.paginate
+"""
+
+import asyncio
+import base64
+
+import pytest
+
+import snapshot
+from catalog import CachedCatalog
+from cursor import CursorError, ResultPager, decode_cursor, encode_cursor
+
+ITEMS = [{'id': n, 'kind': 'even' if n % 2 == 0 else 'odd'} for n in range(25)]
+
+
+def run_query(index, query):
+    return [item for item in index if not query.get('kind') or item['kind'] == query['kind']]
+
+
+def walk(pager, version, index, query, per_page):
+    """Collect every page by following nextCursor from the first page"""
+    results, pagination = pager.page(version, index, query, run_query, per_page=per_page)
+    pages = [results]
+    while pagination['nextCursor']:
+        results, pagination = pager.page(version, index, query, run_query, cursor=pagination['nextCursor'])
+        pages.append(results)
+    return pages
+
+
+class StaticCatalog(CachedCatalog):
+    """A catalog whose upstream always returns the same data"""
+
+    name = "Test"
+    snapshot_name = "test"
+
+    def __init__(self, items, revalidate=False):
+        super().__init__(ttl=0)
+        self.upstream_items = items
+        self.revalidate = revalidate
+
+    async def fetch(self):
+        if self.revalidate and self.items is not None:
+            # Upstream answered 304: keep the items already served
+            return self.items
+        return [dict(item) for item in self.upstream_items]
+
+    def build_index(self, items):
+        return items
+
+
+@pytest.fixture(autouse=True)
+def snapshot_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot, "SNAPSHOT_DIR", str(tmp_path))
+
+
+def test_cursor_round_trip():
+    state = {"v": 1700000000.5, "q": {"searchTerm": "plush", "category": None}, "o": 40, "n": 20}
+    cursor = encode_cursor(state)
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == state
+
+
+@pytest.mark.parametrize("cursor", [
+    "not a cursor!",
+    base64.urlsafe_b64encode(b"not json").decode(),
+    encode_cursor([1, 2, 3]),
+    encode_cursor({"v": 1, "q": {}, "o": 0}),
+    encode_cursor({"v": 1, "q": "kind", "o": 0, "n": 10}),
+    encode_cursor({"v": 1, "q": {}, "o": -10, "n": 10}),
+    encode_cursor({"v": 1, "q": {}, "o": 0, "n": 0}),
+    encode_cursor({"v": 1, "q": {}, "o": "10", "n": 10}),
+])
+def test_tampered_cursor_is_rejected(cursor):
+    with pytest.raises(CursorError, match="Invalid cursor"):
+        decode_cursor(cursor)
+
+
+def test_pages_follow_cursor_in_order():
+    pages = walk(ResultPager(), 1.0, ITEMS, {'kind': 'even'}, per_page=5)
+    assert [len(page) for page in pages] == [5, 5, 3]
+    assert [item['id'] for page in pages for item in page] == list(range(0, 25, 2))
+
+
+def test_cursor_reuses_cached_results():
+    pager = ResultPager()
+    calls = []
+
+    def counting_run(index, query):
+        calls.append(query)
+        return run_query(index, query)
+
+    _, pagination = pager.page(1.0, ITEMS, {}, counting_run, per_page=10)
+    pager.page(1.0, ITEMS, {}, counting_run, cursor=pagination['nextCursor'])
+    assert len(calls) == 1
+
+
+def test_expired_cursor_is_rejected():
+    pager = ResultPager(size=1)
+    _, pagination = pager.page(1.0, ITEMS, {'kind': 'odd'}, run_query, per_page=5)
+    # The catalog was refreshed and another query pushed the old results out
+    pager.page(2.0, ITEMS, {'kind': 'even'}, run_query, per_page=5)
+    with pytest.raises(CursorError, match="Cursor expired"):
+        pager.page(2.0, ITEMS, {}, run_query, cursor=pagination['nextCursor'])
+
+
+def test_cursor_with_altered_version_is_expired():
+    pager = ResultPager()
+    _, pagination = pager.page(1.0, ITEMS, {}, run_query, per_page=5)
+    state = decode_cursor(pagination['nextCursor'])
+    state["v"] = 0.5
+    with pytest.raises(CursorError, match="Cursor expired"):
+        pager.page(1.0, ITEMS, {}, run_query, cursor=encode_cursor(state))
+
+
+@pytest.mark.parametrize("revalidate", [False, True])
+def test_pages_stable_across_refresh_with_unchanged_data(revalidate):
+    async def scenario():
+        catalog = StaticCatalog(ITEMS, revalidate=revalidate)
+        first, pagination = await catalog.paginate({'kind': 'odd'}, run_query, per_page=4)
+        version = catalog.version
+
+        await catalog.sync()
+        assert catalog.version == version
+
+        # The old cursor keeps walking the results it started on
+        pages = [first]
+        while pagination['nextCursor']:
+            results, pagination = await catalog.paginate({}, run_query, cursor=pagination['nextCursor'])
+            pages.append(results)
+        # and a fresh walk over the refreshed catalog yields the same pages
+        fresh = walk(ResultPager(), catalog.version, catalog.index, {'kind': 'odd'}, per_page=4)
+        return pages, fresh
+
+    pages, fresh = asyncio.run(scenario())
+    assert pages == fresh
+    assert [item['id'] for page in pages for item in page] == list(range(1, 25, 2))
+
+
+
+def test_cursor_survives_unchanged_refresh_in_another_process():
+    async def scenario():
+        first = StaticCatalog(ITEMS)
+        _, pagination = await first.paginate({'kind': 'even'}, run_query, per_page=5)
+        # Another worker re-crawls identical data and rewrites the snapshot
+        await StaticCatalog(ITEMS).sync()
+        # A third worker loads that snapshot and is handed the first worker's cursor
+        other = StaticCatalog(ITEMS)
+        assert await other.load_snapshot()
+        assert other.version == first.version
+        results, _ = await other.paginate({}, run_query, cursor=pagination['nextCursor'])
+        return results
+
+    assert [item['id'] for item in asyncio.run(scenario())] == [10, 12, 14, 16, 18]
+
+
+def test_changed_data_gets_a_new_version():
+    async def scenario():
+        catalog = StaticCatalog(ITEMS)
+        await catalog.sync()
+        version = catalog.version
+        catalog.upstream_items = ITEMS[:10]
+        await catalog.sync()
+        return version, catalog.version
+
+    before, after = asyncio.run(scenario())
+    assert before != after
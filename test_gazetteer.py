@@ -0,0 +1,141 @@
+"""
+Tests for the offline gazetteer: name lookups, the KD-tree and the maps tools
+"""
+
+import math
+import random
+
+import pytest
+
+from gazetteer import Gazetteer, KDTree, haversine_km, normalize, search_places, unit_vector, view_location
+
+ROWS = [
+    # name, alternate names, latitude, longitude, feature class, feature code, country, admin1, population
+    ("Kenya", "Jamhuri ya Kenya", -0.5, 37.9, "A", "PCLI", "KE", "00", 53000000),
+    ("Nairobi", "", -1.286, 36.817, "P", "PPLC", "KE", "05", 4400000),
+    ("Mombasa", "", -4.043, 39.668, "P", "PPLA", "KE", "19", 1200000),
+    ("Nairobi National Park", "", -1.373, 36.859, "L", "PRK", "KE", "05", 0),
+    ("Tsavo East National Park", "", -2.766, 38.767, "L", "PRK", "KE", "19", 0),
+    ("Texas", "", 31.0, -100.0, "A", "ADM1", "US", "TX", 29000000),
+    ("Paris", "Lutece", 48.857, 2.352, "P", "PPLC", "FR", "11", 2100000),
+    ("Paris", "", 33.661, -95.556, "P", "PPL", "US", "TX", 25000),
+    ("São Paulo", "Sao Paulo", -23.55, -46.633, "P", "PPLA", "BR", "27", 12300000),
+]
+
+
+def geonames_line(position, row):
+    name, alternates, latitude, longitude, feature_class, feature_code, country, admin1, population = row
+    columns = [str(position), name, normalize(name), alternates, str(latitude), str(longitude),
+               feature_class, feature_code, country, "", admin1, "", "", "", str(population), "", "", "", ""]
+    return "\t".join(columns)
+
+
+@pytest.fixture(scope="module")
+def index(tmp_path_factory):
+    path = tmp_path_factory.mktemp("gazetteer") / "places.tsv"
+    lines = ["# comment", "malformed\tline"] + [geonames_line(n, row) for n, row in enumerate(ROWS)]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return Gazetteer(str(path)).load()
+
+
+def names(places):
+    return [(place.name, place.country_code) for place in places]
+
+
+def test_skips_comments_and_malformed_lines(index):
+    assert len(index) == len(ROWS)
+
+
+def test_lookup_ignores_case_accents_and_punctuation(index):
+    assert names(index.lookup("sao paulo")) == [("São Paulo", "BR")]
+    assert names(index.lookup("SÃO-PAULO")) == [("São Paulo", "BR")]
+    assert names(index.lookup("Lutece")) == [("Paris", "FR")]
+
+
+def test_ambiguous_names_prefer_the_most_populous_place(index):
+    assert names(index.lookup("Paris")) == [("Paris", "FR"), ("Paris", "US")]
+
+
+def test_qualifiers_narrow_by_country_or_state(index):
+    assert names(index.lookup("Paris, Texas")) == [("Paris", "US")]
+    assert names(index.lookup("Paris, US")) == [("Paris", "US")]
+    assert names(index.lookup("Paris, Kenya")) == []
+
+
+def test_partial_names_match_on_every_word(index):
+    assert names(index.lookup("national park nairobi")) == [("Nairobi National Park", "KE")]
+    assert index.lookup("national park atlantis") == []
+    assert index.lookup("") == []
+
+
+def test_kd_tree_matches_brute_force_nearest_neighbours():
+    rng = random.Random(7)
+    coordinates = [(rng.uniform(-90, 90), rng.uniform(-180, 180)) for _ in range(500)]
+    tree = KDTree([unit_vector(*point) for point in coordinates])
+    for _ in range(25):
+        target = (rng.uniform(-90, 90), rng.uniform(-180, 180))
+        expected = sorted(range(len(coordinates)), key=lambda item: haversine_km(*target, *coordinates[item]))[:5]
+        assert [item for _, item in tree.nearest(unit_vector(*target), 5)] == expected
+
+
+def test_kd_tree_honours_radius_and_filter():
+    tree = KDTree([unit_vector(0, longitude) for longitude in range(0, 10)])
+    # About 111 km per degree of longitude at the equator
+    radius = 2 * math.sin(250 / 6371.0088 / 2)
+    assert [item for _, item in tree.nearest(unit_vector(0, 0), 10, radius)] == [0, 1, 2]
+    assert [item for _, item in tree.nearest(unit_vector(0, 0), 2, accept=lambda item: item % 2)] == [1, 3]
+
+
+def test_nearest_reports_great_circle_distance(index):
+    (distance, place), = index.nearest(-1.3, 36.8, 1)
+    assert place.name == "Nairobi"
+    assert distance == pytest.approx(haversine_km(-1.3, 36.8, -1.286, 36.817))
+
+
+def test_view_location_resolves_names_and_coordinates(index):
+    result = view_location("Paris", index)
+    assert (result["name"], result["country"]) == ("Paris", "FR")
+    assert [other["country"] for other in result["alternatives"]] == ["US"]
+
+    result = view_location("-4.0, 39.7", index)
+    assert result["nearestPlace"]["name"] == "Mombasa"
+    assert view_location("Atlantis", index)["error"] == "No place found matching: Atlantis"
+
+
+def test_search_near_a_place_filters_by_kind_and_excludes_the_place(index):
+    result = search_places("parks near Nairobi", index=index)
+    assert [place["name"] for place in result["results"]] == ["Nairobi National Park", "Tsavo East National Park"]
+    assert result["center"]["name"] == "Nairobi"
+
+    result = search_places("parks near Nairobi", radius_km=50, index=index)
+    assert [place["name"] for place in result["results"]] == ["Nairobi National Park"]
+
+
+def test_search_in_a_country_stays_inside_it(index):
+    result = search_places("cities in Kenya", index=index)
+    assert sorted(place["name"] for place in result["results"]) == ["Mombasa", "Nairobi"]
+    assert search_places("cities in Kenya", limit=1, index=index)["count"] == 1
+
+
+def test_search_for_an_unknown_place_is_an_error(index):
+    result = search_places("parks near Atlantis", index=index)
+    assert result["results"] == [] and "error" in result
+    assert "error" in search_places("  ", index=index)
+
+
+@pytest.mark.parametrize("arguments", [
+    {"limit": "ten"},
+    {"limit": [5]},
+    {"radius_km": -5},
+    {"radius_km": "far"},
+    {"radius_km": float("nan")},
+])
+def test_search_rejects_invalid_limit_and_radius(index, arguments):
+    result = search_places("parks near Nairobi", index=index, **arguments)
+    assert result["results"] == [] and result["count"] == 0
+    assert "error" in result
+
+
+def test_search_accepts_numeric_strings(index):
+    result = search_places("parks near Nairobi", limit="1", radius_km="50", index=index)
+    assert [place["name"] for place in result["results"]] == ["Nairobi National Park"]
@@ -0,0 +1,111 @@
+"""
+Tests for the episode and product query indexes
+"""
+
+from episode_index import EpisodeIndex, parse_air_date
+from product_index import ProductIndex
+
+EPISODES = [
+    {"Season": 1, "Episode Number (Broadcast Order)": 1, "Episode Title": "Whale of a Squid",
+     "Air Date": "2011-01-03", "Animals Featured": ["Sperm Whale", "Giant Squid"]},
+    {"Season": 1, "Episode Number (Broadcast Order)": 2, "Episode Title": "Mom of a Croc",
+     "Air Date": "01/04/2011", "Animals Featured": ["Nile Crocodile"]},
+    {"Season": 1, "Episode Number (Broadcast Order)": 3, "Episode Title": "Honey Seekers",
+     "Air Date": "January 5, 2011", "Animals Featured": ["Honey Badger", "Honeyguide"]},
+    {"Season": 2, "Episode Number (Broadcast Order)": "41", "Episode Title": "Cheetah Racer",
+     "Air Date": "2012-02-10", "Animals Featured": ["Cheetah"]},
+    {"Season": 2, "Episode Number (Broadcast Order)": 42, "Episode Title": "Race for the Whale",
+     "Air Date": "unknown", "Animals Featured": ["Humpback Whale"]},
+]
+
+PRODUCTS = [
+    {"id": 1, "title": {"rendered": "Cheetah Plush"}, "description": "<p>Soft toy</p>",
+     "product_categories": ["Toys"], "retailers": [{"name": "Amazon"}]},
+    {"id": 2, "title": {"rendered": "Creature Power Book"}, "description": "<p>All about the cheetah</p>",
+     "product_categories": ["Books"], "retailers": []},
+    {"id": 3, "title": {"rendered": "Plush Orca"}, "description": "<p>An <b>orca</b> plush</p>",
+     "product_categories": ["Toys"], "retailers": []},
+    {"id": 4, "title": {"rendered": "Wild Kratts Puzzle"}, "description": "Puzzles of plushies",
+     "product_categories": ["Games"], "retailers": []},
+]
+
+
+def titles(episodes):
+    return [episode["Episode Title"] for episode in episodes]
+
+
+def ids(products):
+    return [product["id"] for product in products]
+
+
+def test_air_dates_parse_in_every_known_format():
+    assert [parse_air_date(episode["Air Date"]) for episode in EPISODES[:3]] == [
+        parse_air_date("2011-01-03"), parse_air_date("2011-01-04"), parse_air_date("2011-01-05")
+    ]
+    assert parse_air_date("unknown") is None
+
+
+def test_no_filters_returns_every_episode_in_catalog_order():
+    assert titles(EpisodeIndex(EPISODES).query()) == titles(EPISODES)
+
+
+def test_season_animal_and_title_filters_intersect():
+    index = EpisodeIndex(EPISODES)
+    assert titles(index.query(season_number=1)) == ["Whale of a Squid", "Mom of a Croc", "Honey Seekers"]
+    # Animal names match by case-insensitive substring
+    assert titles(index.query(animals_featured=["whale"])) == ["Whale of a Squid", "Race for the Whale"]
+    assert titles(index.query(season_number=2, animals_featured=["whale"])) == ["Race for the Whale"]
+    # Every requested animal must be featured
+    assert titles(index.query(animals_featured=["honey", "guide"])) == ["Honey Seekers"]
+    assert titles(index.query(episode_title="of a")) == ["Whale of a Squid", "Mom of a Croc"]
+    assert titles(index.query(episode_title="RACE")) == ["Cheetah Racer", "Race for the Whale"]
+    assert index.query(season_number=3) == []
+
+
+def test_air_date_range_is_inclusive_and_skips_unparseable_dates():
+    index = EpisodeIndex(EPISODES)
+    assert titles(index.query(air_date_from="2011-01-04", air_date_to="2011-01-05")) == [
+        "Mom of a Croc", "Honey Seekers"
+    ]
+    assert titles(index.query(air_date_from="2012-01-01")) == ["Cheetah Racer"]
+    assert titles(index.query(air_date_to="2011-01-03")) == ["Whale of a Squid"]
+
+
+def test_broadcast_number_range_accepts_numeric_strings():
+    index = EpisodeIndex(EPISODES)
+    assert titles(index.query(episode_number_from=3, episode_number_to=41)) == ["Honey Seekers", "Cheetah Racer"]
+    assert titles(index.query(episode_number_from=42)) == ["Race for the Whale"]
+    assert titles(index.query(season_number=1, episode_number_to=2)) == ["Whale of a Squid", "Mom of a Croc"]
+
+
+def test_title_matches_rank_above_description_matches():
+    # "cheetah" is in product 1's title and only in product 2's description
+    assert ids(ProductIndex(PRODUCTS).search("cheetah")) == [1, 2]
+
+
+def test_every_query_token_must_match():
+    index = ProductIndex(PRODUCTS)
+    assert ids(index.search("plush orca")) == [3]
+    assert index.search("plush dragon") == []
+    assert index.search("   ") == []
+
+
+def test_prefix_matches_score_below_exact_matches():
+    index = ProductIndex(PRODUCTS)
+    # "plush" matches products 1 and 3 exactly and "plushies" in product 4 by prefix only
+    ranked = ids(index.search("plush"))
+    assert sorted(ranked[:2]) == [1, 3] and ranked[2:] == [4]
+    assert ids(index.search("puzz")) == [4]
+
+
+def test_category_filter_and_browse_order():
+    index = ProductIndex(PRODUCTS)
+    assert sorted(ids(index.search("plush", category="toys"))) == [1, 3]
+    assert ids(index.filter("Toys")) == [1, 3]
+    assert ids(index.filter()) == [1, 2, 3, 4]
+
+
+def test_html_is_stripped_before_indexing():
+    index = ProductIndex(PRODUCTS)
+    assert "p" not in index.postings and "b" not in index.postings
+    assert ids(index.search("orca")) == [3]
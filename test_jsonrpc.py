@@ -0,0 +1,127 @@
+"""
+Tests for JSON-RPC batches, SSE tool-call streams and pre-encoded CachedJSON payloads
+"""
+
+import json
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+import jsonrpc
+from jsonrpc import CachedJSON, handle_rpc_batch, rpc_error, stream_rpc, wants_event_stream
+from progress import ProgressChannel, report_progress
+
+PAYLOAD = {"tools": [{"name": f"tool_{n}", "description": "A tool " * 20} for n in range(20)]}
+
+
+async def echo(message):
+    if message.get("method") == "fail":
+        raise RuntimeError("tool failed")
+    if (message.get("params") or {}).get("name") == "slow":
+        channel = ProgressChannel()
+        with channel.waiting(), channel.reporting():
+            report_progress(1, 2, "halfway")
+    return {"jsonrpc": "2.0", "id": message.get("id"), "result": message.get("params")}
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    cached = CachedJSON(PAYLOAD)
+
+    @app.get("/tools")
+    async def tools(request: Request):
+        return cached.response(request)
+
+    @app.post("/mcp")
+    async def mcp(request: Request):
+        body = await request.json()
+        if isinstance(body, list):
+            return await handle_rpc_batch(body, echo)
+        if body.get("method") == "tools/list":
+            return cached.rpc_response(request, body.get("id"))
+        if wants_event_stream(request, body):
+            return stream_rpc(body, echo)
+        return await echo(body)
+
+    return TestClient(app)
+
+
+def test_batch_answers_requests_in_order_and_skips_notifications(client):
+    response = client.post("/mcp", json=[
+        {"jsonrpc": "2.0", "id": 1, "method": "echo", "params": {"n": 1}},
+        {"jsonrpc": "2.0", "method": "echo"},
+        "not a message",
+        {"jsonrpc": "2.0", "id": 2, "method": "fail"},
+    ])
+    assert response.status_code == 200
+    assert response.json() == [
+        {"jsonrpc": "2.0", "id": 1, "result": {"n": 1}},
+        rpc_error(None, jsonrpc.INVALID_REQUEST, "Invalid Request"),
+        rpc_error(2, jsonrpc.INTERNAL_ERROR, "tool failed"),
+    ]
+
+
+def test_notification_only_batch_gets_no_body(client):
+    response = client.post("/mcp", json=[{"jsonrpc": "2.0", "method": "notifications/initialized"}])
+    assert response.status_code == 202
+    assert response.content == b""
+
+
+def test_empty_and_oversized_batches_are_invalid(client, monkeypatch):
+    assert client.post("/mcp", json=[]).json()["error"]["code"] == jsonrpc.INVALID_REQUEST
+
+    monkeypatch.setattr(jsonrpc, "MAX_BATCH_SIZE", 3)
+    response = client.post("/mcp", json=[{"jsonrpc": "2.0", "id": n, "method": "echo"} for n in range(4)])
+    assert response.json()["error"]["code"] == jsonrpc.INVALID_REQUEST
+    assert "exceeds 3" in response.json()["error"]["message"]
+
+
+def test_tool_call_streams_progress_then_the_result(client):
+    message = {"jsonrpc": "2.0", "id": 3, "method": "tools/call",
+               "params": {"name": "slow", "_meta": {"progressToken": "t"}}}
+    response = client.post("/mcp", json=message, headers={"Accept": "application/json, text/event-stream"})
+    assert response.headers["content-type"].startswith("text/event-stream")
+
+    events = [json.loads(line[len("data: "):]) for line in response.text.splitlines() if line.startswith("data: ")]
+    assert events == [
+        {"jsonrpc": "2.0", "method": "notifications/progress",
+         "params": {"progressToken": "t", "progress": 1, "message": "halfway", "total": 2}},
+        {"jsonrpc": "2.0", "id": 3, "result": message["params"]},
+    ]
+
+
+def test_only_tool_calls_that_accept_event_streams_are_streamed(client):
+    response = client.post("/mcp", json={"jsonrpc": "2.0", "id": 1, "method": "tools/call", "params": {}})
+    assert response.headers["content-type"] == "application/json"
+    assert response.json() == {"jsonrpc": "2.0", "id": 1, "result": {}}
+
+
+def test_cached_payload_has_a_strong_etag_and_answers_304(client):
+    response = client.get("/tools", headers={"Accept-Encoding": "identity"})
+    assert response.json() == PAYLOAD
+    etag = response.headers["etag"]
+    assert not etag.startswith("W/")
+
+    not_modified = client.get("/tools", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    assert client.get("/tools", headers={"If-None-Match": f'"other", W/{etag}'}).status_code == 304
+    assert client.get("/tools", headers={"If-None-Match": '"other"'}).status_code == 200
+
+
+def test_compressed_payload_carries_a_weak_etag(client):
+    response = client.get("/tools", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["etag"].startswith("W/")
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.json() == PAYLOAD
+
+
+def test_tools_list_splices_the_payload_without_an_etag(client):
+    response = client.post("/mcp", json={"jsonrpc": "2.0", "id": "a", "method": "tools/list"},
+                           headers={"If-None-Match": "*"})
+    assert response.status_code == 200
+    assert "etag" not in response.headers
+    assert response.json() == {"jsonrpc": "2.0", "id": "a", "result": PAYLOAD}
@@ -0,0 +1,118 @@
+"""
+Tests for the stdio proxies' on-disk response cache
+"""
+
+import json
+
+import pytest
+
+import proxy_cache
+from proxy_cache import ProxyCache, cache_key, is_success, parse_ttls
+
+
+def call(name, arguments, request_id=1):
+    return {"jsonrpc": "2.0", "id": request_id, "method": "tools/call",
+            "params": {"name": name, "arguments": arguments}}
+
+
+def answer(payload, request_id=1):
+    return {"jsonrpc": "2.0", "id": request_id, "result": {"content": [{"type": "text", "text": json.dumps(payload)}]}}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(proxy_cache.time, "time", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def cache(tmp_path, clock):
+    cache = ProxyCache(str(tmp_path), ttls={"get_wild_kratts_products": 60})
+    yield cache
+    cache.close()
+
+
+def test_equivalent_calls_share_a_key():
+    assert cache_key(call("get_wild_kratts_products", {"searchTerm": " plush ", "category": None})) == \
+        cache_key(call("get_wild_kratts_products", {"searchTerm": "plush"}, request_id=9))
+    assert cache_key(call("get_wild_kratts_products", {"searchTerm": "plush"})) != \
+        cache_key(call("get_wild_kratts_episodes", {"searchTerm": "plush"}))
+    assert cache_key({"jsonrpc": "2.0", "id": 1, "method": "initialize"}) is None
+
+
+def test_parse_ttls():
+    assert parse_ttls("get_wild_kratts_products=60, tools/list=0,,bad") == {
+        "get_wild_kratts_products": 60.0, "tools/list": 0.0
+    }
+
+
+def test_hit_carries_the_new_request_id(cache):
+    request = call("get_wild_kratts_products", {"searchTerm": "plush"})
+    assert cache.get(request) is None
+    cache.put(request, answer({"products": [1]}))
+    hit = cache.get(call("get_wild_kratts_products", {"searchTerm": "plush"}, request_id=7))
+    assert hit == answer({"products": [1]}, request_id=7)
+
+
+def test_entries_expire_after_the_tool_ttl(cache, clock):
+    products = call("get_wild_kratts_products", {})
+    episodes = call("get_wild_kratts_episodes", {})
+    cache.put(products, answer({"products": []}))
+    cache.put(episodes, answer({"episodes": []}))
+
+    clock[0] += 61
+    assert cache.get(products) is None
+    # Episodes keep the default one hour TTL
+    assert cache.get(episodes) is not None
+
+
+def test_zero_ttl_disables_caching(tmp_path, clock):
+    cache = ProxyCache(str(tmp_path), ttls={"tools/list": 0})
+    request = {"jsonrpc": "2.0", "id": 1, "method": "tools/list"}
+    cache.put(request, {"jsonrpc": "2.0", "id": 1, "result": {"tools": []}})
+    assert cache.get(request) is None
+    cache.close()
+
+
+@pytest.mark.parametrize("response", [
+    {"jsonrpc": "2.0", "id": 1, "error": {"code": -32603, "message": "boom"}},
+    {"jsonrpc": "2.0", "id": 1, "result": {"isError": True, "content": []}},
+    answer({"error": "Failed to fetch products", "products": []}),
+    answer({"products": [1], "partial": True}),
+    answer({"episodes": [1], "stale": True}),
+])
+def test_errors_and_degraded_results_are_not_cached(cache, response):
+    request = call("get_wild_kratts_products", {"searchTerm": "orca"})
+    assert not is_success(response)
+    cache.put(request, response)
+    assert cache.get(request) is None
+
+
+def test_least_recently_used_entries_are_evicted_over_the_size_limit(tmp_path, clock):
+    size = len(json.dumps(answer({"n": 0})["result"], separators=(",", ":")))
+    cache = ProxyCache(str(tmp_path), max_bytes=size * 2)
+    requests = [call("get_wild_kratts_episodes", {"n": n}) for n in range(3)]
+
+    cache.put(requests[0], answer({"n": 0}))
+    clock[0] += 1
+    cache.put(requests[1], answer({"n": 1}))
+    clock[0] += 1
+    # Reading the first entry makes the second the least recently used
+    assert cache.get(requests[0]) is not None
+    clock[0] += 1
+    cache.put(requests[2], answer({"n": 2}))
+
+    assert [cache.get(request) is not None for request in requests] == [True, False, True]
+    cache.close()
+
+
+def test_entries_survive_reopening(tmp_path, clock):
+    request = call("search_google_maps", {"search": "parks near Denver"})
+    cache = ProxyCache(str(tmp_path))
+    cache.put(request, answer({"results": []}))
+    cache.close()
+
+    reopened = ProxyCache(str(tmp_path))
+    assert reopened.get(request) == answer({"results": []})
+    reopened.close()
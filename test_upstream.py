@@ -0,0 +1,169 @@
+"""
+Tests for the shared upstream client: request coalescing, revalidation and the circuit breaker
+"""
+
+import asyncio
+
+import httpx
+import pytest
+
+import upstream
+from upstream import CircuitBreaker, UpstreamClient, UpstreamUnavailable
+
+URL = "https://upstream.test/wp-json/wild-kratts/v1/episodes"
+
+
+def make_client(handler, **kwargs):
+    client = UpstreamClient(**kwargs)
+    client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return client
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(upstream, "RETRY_BACKOFF", 0)
+
+
+def test_concurrent_identical_fetches_share_one_request():
+    calls = []
+
+    async def handler(request):
+        calls.append(request.url)
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json=[{"Episode Title": "Whale of a Squid"}])
+
+    async def scenario():
+        client = make_client(handler)
+        results = await asyncio.gather(*(client.fetch_json(URL, route="episodes") for _ in range(5)))
+        # The flight lands once everyone has it, so the next fetch goes upstream again
+        await client.fetch_json(URL, route="episodes")
+        await client.close()
+        return results
+
+    results = asyncio.run(scenario())
+    assert len(calls) == 2
+    assert all(result.data is results[0].data for result in results)
+
+
+def test_cancelling_one_waiter_keeps_the_shared_fetch():
+    calls = []
+
+    async def handler(request):
+        calls.append(request.url)
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json=[])
+
+    async def scenario():
+        client = make_client(handler)
+        first = asyncio.create_task(client.fetch_json(URL))
+        second = asyncio.create_task(client.fetch_json(URL))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        result = await second
+        await client.close()
+        return first, result
+
+    first, result = asyncio.run(scenario())
+    assert first.cancelled()
+    assert result.status_code == 200
+    assert len(calls) == 1
+
+
+def test_validators_are_sent_and_304_reuses_the_parsed_body():
+    seen = []
+
+    def handler(request):
+        seen.append(dict(request.headers))
+        if request.headers.get("if-none-match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, json=[{"id": 1}],
+                              headers={"ETag": '"v1"', "Last-Modified": "Mon, 03 Jan 2011 00:00:00 GMT"})
+
+    async def scenario():
+        client = make_client(handler)
+        first = await client.fetch_json(URL)
+        second = await client.fetch_json(URL)
+        await client.close()
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert "if-none-match" not in seen[0]
+    assert seen[1]["if-none-match"] == '"v1"'
+    assert seen[1]["if-modified-since"] == "Mon, 03 Jan 2011 00:00:00 GMT"
+    assert not first.revalidated
+    assert second.revalidated and second.status_code == 200
+    assert second.data is first.data
+
+
+def test_validator_cache_is_bounded_and_skips_bodies_without_validators():
+    def handler(request):
+        if request.url.path.endswith("/plain"):
+            return httpx.Response(200, json=[])
+        return httpx.Response(200, json=[], headers={"ETag": f'"{request.url.path}"'})
+
+    async def scenario():
+        client = make_client(handler, validator_cache_size=2)
+        for path in ("/a", "/b", "/plain", "/c"):
+            await client.fetch_json("https://upstream.test" + path)
+        await client.close()
+        return list(client._validated)
+
+    assert asyncio.run(scenario()) == ["https://upstream.test/b", "https://upstream.test/c"]
+
+
+def test_retryable_status_is_retried_then_returned():
+    statuses = iter([503, 200])
+
+    def handler(request):
+        return httpx.Response(next(statuses), json=[])
+
+    async def scenario():
+        client = make_client(handler, retries=2)
+        response = await client.get_with_retries(URL, route="episodes")
+        await client.close()
+        return response, client.breaker("episodes")
+
+    response, breaker = asyncio.run(scenario())
+    assert response.status_code == 200
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.failures == 0
+
+
+def test_circuit_opens_after_consecutive_failures_and_fails_fast():
+    calls = []
+
+    def handler(request):
+        calls.append(request.url)
+        raise httpx.ConnectError("refused", request=request)
+
+    async def scenario():
+        client = make_client(handler, retries=0)
+        client._breakers["episodes"] = CircuitBreaker("episodes", failure_threshold=3, reset_timeout=60)
+        for _ in range(3):
+            with pytest.raises(httpx.ConnectError):
+                await client.get_with_retries(URL, route="episodes")
+        with pytest.raises(UpstreamUnavailable, match="circuit open"):
+            await client.get_with_retries(URL, route="episodes")
+        await client.close()
+        return client.breaker("episodes")
+
+    breaker = asyncio.run(scenario())
+    assert breaker.state == CircuitBreaker.OPEN
+    assert len(calls) == 3
+
+
+def test_half_open_circuit_allows_one_trial_request():
+    breaker = CircuitBreaker("products", failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+    breaker.before_request()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    with pytest.raises(UpstreamUnavailable, match="half-open"):
+        breaker.before_request()
+
+    # A failed trial reopens the circuit, a successful one closes it
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    breaker.before_request()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
@@ -0,0 +1,305 @@
+"""
+Shared upstream HTTP client for the Wild Kratts WordPress API
+"""
+
+import asyncio
+import os
+import random
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import httpx
+
+from metrics import (UPSTREAM_CIRCUIT_STATE, UPSTREAM_REQUEST_DURATION, UPSTREAM_REQUESTS_IN_FLIGHT,
+                     UPSTREAM_RETRIES, cache_result)
+
+# WordPress REST endpoints (point WILDKRATTS_API_BASE at a stub to benchmark locally)
+BASE_URL = os.environ.get("WILDKRATTS_API_BASE", "https://wildkratts.com/wp-json").rstrip("/")
+EPISODES_API = f"{BASE_URL}/wild-kratts/v1/episodes"
+PRODUCTS_API = f"{BASE_URL}/wp/v2/products"
+
+# Connection pool settings (overridable per deployment)
+MAX_CONNECTIONS = int(os.environ.get("UPSTREAM_MAX_CONNECTIONS", "20"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.environ.get("UPSTREAM_MAX_KEEPALIVE", "10"))
+KEEPALIVE_EXPIRY = float(os.environ.get("UPSTREAM_KEEPALIVE_EXPIRY", "30"))
+CONNECT_TIMEOUT = float(os.environ.get("UPSTREAM_CONNECT_TIMEOUT", "5"))
+
+# Per-route read timeouts; the episodes list is one large payload, product pages are smaller
+ROUTE_TIMEOUTS = {
+    "episodes": float(os.environ.get("UPSTREAM_TIMEOUT_EPISODES", "30")),
+    "products": float(os.environ.get("UPSTREAM_TIMEOUT_PRODUCTS", "15")),
+}
+DEFAULT_TIMEOUT = float(os.environ.get("UPSTREAM_TIMEOUT_DEFAULT", "30"))
+
+# Parsed bodies kept (per URL) for ETag / Last-Modified revalidation
+VALIDATOR_CACHE_SIZE = int(os.environ.get("UPSTREAM_VALIDATOR_CACHE_SIZE", "256"))
+
+# Retries after a connection failure or a retryable status, with full-jitter exponential backoff
+RETRIES = int(os.environ.get("UPSTREAM_RETRIES", "2"))
+RETRY_BACKOFF = float(os.environ.get("UPSTREAM_RETRY_BACKOFF", "0.25"))
+RETRY_MAX_BACKOFF = float(os.environ.get("UPSTREAM_RETRY_MAX_BACKOFF", "4"))
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Consecutive failures that open an endpoint's circuit, and how long it stays open
+CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get("UPSTREAM_CIRCUIT_FAILURES", "5"))
+CIRCUIT_RESET_TIMEOUT = float(os.environ.get("UPSTREAM_CIRCUIT_RESET", "30"))
+
+
+class UpstreamUnavailable(Exception):
+    """Raised without calling upstream while an endpoint's circuit is open"""
+
+
+class CircuitBreaker:
+    """Per-endpoint breaker: opens after consecutive failures and fails fast until a trial request succeeds"""
+
+    CLOSED, HALF_OPEN, OPEN = "closed", "half-open", "open"
+    _STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+    def __init__(self, endpoint: str, failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+                 reset_timeout: float = CIRCUIT_RESET_TIMEOUT):
+        self.endpoint = endpoint
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._set_state(self.CLOSED)
+
+    def _set_state(self, state: str):
+        self.state = state
+        UPSTREAM_CIRCUIT_STATE.set(self._STATE_VALUES[state], endpoint=self.endpoint)
+
+    def before_request(self):
+        """Raise UpstreamUnavailable unless a request may go out now"""
+        if self.state == self.OPEN:
+            remaining = self.reset_timeout - (time.monotonic() - self.opened_at)
+            if remaining > 0:
+                raise UpstreamUnavailable(
+                    f"Upstream {self.endpoint} is unavailable (circuit open, retrying in {remaining:.0f}s)")
+            self._set_state(self.HALF_OPEN)
+        if self.state == self.HALF_OPEN:
+            # Only one trial request probes a recovering upstream
+            if self._trial_in_flight:
+                raise UpstreamUnavailable(f"Upstream {self.endpoint} is unavailable (circuit half-open)")
+            self._trial_in_flight = True
+
+    def record_success(self):
+        self.failures = 0
+        self._trial_in_flight = False
+        if self.state != self.CLOSED:
+            self._set_state(self.CLOSED)
+
+    def record_failure(self):
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+            self._set_state(self.OPEN)
+
+    def release(self):
+        """Forget a request that ended without an outcome (e.g. cancelled)"""
+        self._trial_in_flight = False
+
+
+class UpstreamResult:
+    """Status, headers and parsed JSON body of an upstream GET, safe to share between callers"""
+
+    def __init__(self, status_code: int, headers: httpx.Headers, data: Any, revalidated: bool = False):
+        self.status_code = status_code
+        self.headers = headers
+        self.data = data
+        # True when upstream answered 304 and data is the body cached from an earlier fetch
+        self.revalidated = revalidated
+
+    @property
+    def is_success(self) -> bool:
+        return 200 <= self.status_code < 300
+
+
+class _Flight:
+    """One in-flight upstream fetch and the number of callers waiting on it"""
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class UpstreamClient:
+    """Long-lived, pooled httpx client shared by every upstream fetch"""
+
+    def __init__(self, max_connections: int = MAX_CONNECTIONS,
+                 max_keepalive_connections: int = MAX_KEEPALIVE_CONNECTIONS,
+                 keepalive_expiry: float = KEEPALIVE_EXPIRY,
+                 route_timeouts: Optional[Dict[str, float]] = None,
+                 validator_cache_size: int = VALIDATOR_CACHE_SIZE,
+                 retries: int = RETRIES):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.route_timeouts = {
+            route: httpx.Timeout(seconds, connect=CONNECT_TIMEOUT)
+            for route, seconds in (route_timeouts or ROUTE_TIMEOUTS).items()
+        }
+        self.default_timeout = httpx.Timeout(DEFAULT_TIMEOUT, connect=CONNECT_TIMEOUT)
+        self._client: Optional[httpx.AsyncClient] = None
+        self._inflight: Dict[str, _Flight] = {}
+        self.validator_cache_size = validator_cache_size
+        self._validated: "OrderedDict[str, UpstreamResult]" = OrderedDict()
+        self.retries = retries
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Return the pooled client, creating it on first use outside the app lifespan"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                limits=self.limits,
+                timeout=self.default_timeout,
+                headers={"Accept": "application/json"}
+            )
+        return self._client
+
+    async def start(self):
+        """Open the connection pool"""
+        self.client
+
+    async def close(self):
+        """Close the connection pool"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def get(self, url: str, route: str = None, **kwargs) -> httpx.Response:
+        """GET an upstream URL using the timeout configured for its route"""
+        timeout = self.route_timeouts.get(route, self.default_timeout)
+        endpoint = route or "other"
+        status = "error"
+        started = time.perf_counter()
+        with UPSTREAM_REQUESTS_IN_FLIGHT.track_inprogress(endpoint=endpoint):
+            try:
+                response = await self.client.get(url, timeout=timeout, **kwargs)
+                status = response.status_code
+                return response
+            finally:
+                UPSTREAM_REQUEST_DURATION.observe(time.perf_counter() - started, endpoint=endpoint, status=status)
+
+    def breaker(self, route: str = None) -> CircuitBreaker:
+        endpoint = route or "other"
+        if endpoint not in self._breakers:
+            self._breakers[endpoint] = CircuitBreaker(endpoint)
+        return self._breakers[endpoint]
+
+    async def get_with_retries(self, url: str, route: str = None, **kwargs) -> httpx.Response:
+        """GET through the endpoint's circuit breaker, retrying transient failures with jittered backoff.
+
+        Connection errors, timeouts and 429/5xx responses count as failures.
+        Once retries run out, the last response is returned or the last error
+        is raised. While the circuit is open this raises UpstreamUnavailable
+        immediately.
+        """
+        breaker = self.breaker(route)
+        attempt = 0
+        while True:
+            breaker.before_request()
+            response, error = None, None
+            try:
+                response = await self.get(url, route=route, **kwargs)
+            except httpx.TransportError as transport_error:
+                error = transport_error
+            except BaseException:
+                breaker.release()
+                raise
+
+            if response is not None and response.status_code not in RETRY_STATUSES:
+                breaker.record_success()
+                return response
+            breaker.record_failure()
+
+            if attempt >= self.retries or breaker.state == CircuitBreaker.OPEN:
+                if error is not None:
+                    raise error
+                return response
+
+            delay = random.uniform(0, min(RETRY_MAX_BACKOFF, RETRY_BACKOFF * 2 ** attempt))
+            retry_after = response.headers.get("retry-after") if response is not None else None
+            if retry_after and retry_after.isdigit() and int(retry_after) <= RETRY_MAX_BACKOFF:
+                delay = max(delay, float(retry_after))
+            UPSTREAM_RETRIES.inc(endpoint=breaker.endpoint)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def fetch_json(self, url: str, route: str = None) -> UpstreamResult:
+        """GET and parse an upstream URL, sharing one request between concurrent identical calls.
+
+        Callers receive the same parsed body and must treat it as read-only.
+        The shared request is only cancelled once every caller waiting on it
+        has been cancelled. A URL fetched before is revalidated with its
+        ETag / Last-Modified, and a 304 reuses the body already parsed.
+        """
+        flight = self._inflight.get(url)
+        cache_result("upstream_inflight", flight is not None)
+        if flight is None:
+            flight = _Flight(asyncio.create_task(self._fetch_json(url, route)))
+            self._inflight[url] = flight
+            flight.task.add_done_callback(lambda task: self._land(url, flight))
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                flight.task.cancel()
+
+    def _land(self, url: str, flight: _Flight):
+        if self._inflight.get(url) is flight:
+            del self._inflight[url]
+        # Mark the exception as retrieved when every caller was cancelled before it landed
+        if not flight.task.cancelled():
+            flight.task.exception()
+
+    async def _fetch_json(self, url: str, route: str = None) -> UpstreamResult:
+        cached = self._validated.get(url)
+        headers = {}
+        if cached is not None:
+            if "etag" in cached.headers:
+                headers["If-None-Match"] = cached.headers["etag"]
+            if "last-modified" in cached.headers:
+                headers["If-Modified-Since"] = cached.headers["last-modified"]
+
+        response = await self.get_with_retries(url, route=route, headers=headers)
+
+        revalidated = response.status_code == 304 and cached is not None
+        cache_result("upstream_validator", revalidated)
+        if revalidated:
+            self._validated.move_to_end(url)
+            return UpstreamResult(cached.status_code, cached.headers, cached.data, revalidated=True)
+
+        data = response.json() if response.is_success else None
+        result = UpstreamResult(response.status_code, response.headers, data)
+        self._remember(url, result)
+        return result
+
+    def _remember(self, url: str, result: UpstreamResult):
+        """Keep successful bodies that carry a validator so the next fetch can be conditional"""
+        if not result.is_success or not ("etag" in result.headers or "last-modified" in result.headers):
+            self._validated.pop(url, None)
+            return
+        self._validated[url] = result
+        self._validated.move_to_end(url)
+        while len(self._validated) > self.validator_cache_size:
+            self._validated.popitem(last=False)
+
+
+# Process-wide client, opened and closed by each app's lifespan
+upstream = UpstreamClient()
@@ -0,0 +1,276 @@
+"""
+Shared Wild Kratts API engine behind every server variant, with selectable response profiles
+
+A profile controls page sizes, which fields each product / episode keeps, how
+long text is truncated and the shape of the result. Servers pick a default
+(RESPONSE_PROFILE overrides it per deployment) and callers may ask for another
+one per request.
+"""
+
+import os
+from typing import Any, Callable, Dict, List, Optional
+
+from catalog import EpisodeCatalog, ProductCatalog
+from product_index import ProductIndex, rendered, select_fields, strip_html
+from progress import set_partial_filter
+from upstream import BASE_URL
+
+# Per-deployment override of a server's default profile
+RESPONSE_PROFILE = os.environ.get("RESPONSE_PROFILE")
+
+# Characters kept of long text (product descriptions, episode summaries) in the standard profile
+TEXT_LIMIT = int(os.environ.get("RESPONSE_TEXT_LIMIT", "280"))
+
+EPISODE_FIELDS = (
+    "Season", "Episode Number (Broadcast Order)", "Episode Number (Internal)",
+    "Episode Title", "Air Date", "imagePath", "Summary", "Animals Featured",
+    "Creature Powers", "Locations", "streamingUrls"
+)
+
+
+def truncate(text: str, limit: int = TEXT_LIMIT) -> str:
+    if len(text) <= limit:
+        return text
+    return text[:limit].rstrip() + "…"
+
+
+def compact_product(product: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'id': product.get('id'),
+        'title': rendered(product.get('title')),
+        'link': product.get('link', ''),
+        'categories': product.get('product_categories', [])
+    }
+
+
+def standard_product(product: Dict[str, Any]) -> Dict[str, Any]:
+    # The compact fields, under the same names, plus plain-text description, image and retailers
+    return {
+        **compact_product(product),
+        'description': truncate(strip_html(rendered(product.get('description')))),
+        'featured_image': product.get('featured_image'),
+        'retailers': product.get('retailers', [])
+    }
+
+
+def compact_episode(episode: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'season': episode.get('Season'),
+        'episode_number': episode.get('Episode Number (Broadcast Order)'),
+        'title': episode.get('Episode Title', ''),
+        'air_date': episode.get('Air Date', ''),
+        'animals': (episode.get('Animals Featured') or [])[:5]  # Limit to 5 animals
+    }
+
+
+def standard_episode(episode: Dict[str, Any]) -> Dict[str, Any]:
+    # The compact fields, under the same names, with every animal plus summary and locations
+    summary = episode.get('Summary')
+    return {
+        **compact_episode(episode),
+        'animals': episode.get('Animals Featured') or [],
+        'summary': truncate(summary) if isinstance(summary, str) else '',
+        'locations': episode.get('Locations') or []
+    }
+
+
+def select_episode_fields(episodes: List[Dict[str, Any]], fields: Optional[List[str]]) -> List[Dict[str, Any]]:
+    """Project episodes onto the requested fields; unknown names are ignored"""
+    valid_requested_fields = [field for field in fields or [] if field in EPISODE_FIELDS]
+    if not valid_requested_fields:
+        return episodes
+    return [{field: episode.get(field) for field in valid_requested_fields} for episode in episodes]
+
+
+class ResponseProfile:
+    """Page sizes, per-item projections and result shape for one latency / payload tradeoff.
+
+    Products and episodes are projected with product_view / episode_view
+    (None keeps the catalog objects). episodes_per_page=None returns every
+    matching episode unless the caller passes a limit or cursor. With
+    counted=True results carry count / page / nextCursor at the top level
+    instead of a pagination block.
+    """
+
+    def __init__(self, name: str, products_per_page: int, episodes_per_page: Optional[int],
+                 product_view: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None,
+                 episode_view: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None,
+                 counted: bool = False):
+        self.name = name
+        self.products_per_page = products_per_page
+        self.episodes_per_page = episodes_per_page
+        self.product_view = product_view
+        self.episode_view = episode_view
+        self.counted = counted
+
+    def products(self, products: List[Dict[str, Any]], fields: Optional[List[str]]) -> List[Dict[str, Any]]:
+        """Explicitly requested fields win over the profile's projection"""
+        if fields:
+            return select_fields(products, fields)
+        if self.product_view is None:
+            return products
+        return [self.product_view(product) for product in products]
+
+    def episodes(self, episodes: List[Dict[str, Any]], fields: Optional[List[str]]) -> List[Dict[str, Any]]:
+        if fields:
+            return select_episode_fields(episodes, fields)
+        if self.episode_view is None:
+            return episodes
+        return [self.episode_view(episode) for episode in episodes]
+
+
+PROFILES = {
+    # Small pages and a handful of flat fields: the quickest responses and smallest payloads
+    'compact': ResponseProfile('compact', 20, 10, compact_product, compact_episode, counted=True),
+    # Medium pages; HTML stripped, long text truncated and rarely used fields dropped
+    'standard': ResponseProfile('standard', 50, 50, standard_product, standard_episode),
+    # Large pages of the complete catalog objects
+    'full': ResponseProfile('full', 100, None),
+}
+
+# Tool input schema property shared by every server's product and episode tools
+PROFILE_PARAMETER = {
+    "type": "string",
+    "enum": list(PROFILES),
+    "description": "Response size: compact (smallest), standard or full (complete objects)"
+}
+
+
+class WildKrattsAPI:
+    """Episode and product queries over the cached catalogs, shaped by a response profile"""
+
+    def __init__(self, default_profile: str = 'full'):
+        self.base_url = BASE_URL
+        self.episodes_api = f"{self.base_url}/wild-kratts/v1/episodes"
+        self.products_api = f"{self.base_url}/wp/v2/products"
+        self.episode_catalog = EpisodeCatalog(self.episodes_api)
+        self.product_catalog = ProductCatalog(self.products_api)
+        name = RESPONSE_PROFILE or default_profile
+        if name not in PROFILES:
+            raise ValueError(f"Unknown RESPONSE_PROFILE: {name} (expected one of {', '.join(PROFILES)})")
+        self.default_profile = PROFILES[name]
+
+    def profile(self, name: Optional[str] = None) -> ResponseProfile:
+        if not name:
+            return self.default_profile
+        if name not in PROFILES:
+            raise ValueError(f"Unknown profile: {name} (expected one of {', '.join(PROFILES)})")
+        return PROFILES[name]
+
+    async def get_products(self, search_term: str = None, category: str = None, page: int = 1,
+                           fields: List[str] = None, cursor: str = None, profile: str = None) -> dict:
+        """Fetch Wild Kratts products"""
+        shape = self.default_profile
+
+        try:
+            shape = self.profile(profile)
+            per_page = shape.products_per_page
+
+            if search_term:
+                # Stream per-page matches while a cold catalog crawl is still running
+                set_partial_filter(lambda page: shape.products(ProductIndex(page).search(search_term, category),
+                                                               fields))
+
+            def run(index, query):
+                if query['searchTerm']:
+                    # Search mode - rank matches from the local catalog index
+                    return index.search(query['searchTerm'], query['category'])
+                # Browse mode - page through the cached catalog
+                return index.filter(query['category'])
+
+            products, pagination = await self.product_catalog.paginate(
+                {'searchTerm': search_term, 'category': category}, run,
+                cursor=cursor, page=page, per_page=per_page
+            )
+            products = shape.products(products, fields)
+
+            if shape.counted:
+                result = {
+                    'products': products,
+                    'count': len(products),
+                    'page': pagination['currentPage'],
+                    'nextCursor': pagination['nextCursor']
+                }
+            else:
+                result = {'products': products, 'pagination': pagination}
+            # partial / stale / warning when the catalog is incomplete or could not be refreshed
+            result.update(self.product_catalog.flags())
+            return result
+
+        except Exception as error:
+            if shape.counted:
+                return {
+                    'error': f"Error fetching products: {str(error)}",
+                    'products': [],
+                    'count': 0,
+                    'page': page,
+                    'nextCursor': None
+                }
+            return {
+                'error': f"Error fetching products: {str(error)}",
+                'products': [],
+                'pagination': {
+                    'currentPage': page,
+                    'totalItems': 0,
+                    'totalPages': 0,
+                    'itemsPerPage': shape.products_per_page,
+                    'nextCursor': None
+                }
+            }
+
+    async def get_episodes(self, season_number: int = None, episode_title: str = None,
+                           animals_featured: List[str] = None, fields: List[str] = None,
+                           air_date_from: str = None, air_date_to: str = None,
+                           episode_number_from: int = None, episode_number_to: int = None,
+                           limit: int = None, cursor: str = None, profile: str = None) -> dict:
+        """Fetch Wild Kratts episodes"""
+        shape = self.default_profile
+
+        try:
+            shape = self.profile(profile)
+            query = {
+                'season_number': season_number,
+                'episode_title': episode_title,
+                'animals_featured': animals_featured,
+                'air_date_from': air_date_from,
+                'air_date_to': air_date_to,
+                'episode_number_from': episode_number_from,
+                'episode_number_to': episode_number_to
+            }
+
+            # Apply filters
+            per_page = limit or shape.episodes_per_page
+            if per_page or cursor:
+                # Paginated - walk the results with nextCursor
+                episodes, pagination = await self.episode_catalog.paginate(
+                    query, lambda index, query: index.query(**query), cursor=cursor, per_page=per_page or 50
+                )
+            else:
+                index = await self.episode_catalog.get_index()
+                episodes = index.query(**query)
+                pagination = None
+
+            episodes = shape.episodes(episodes, fields)
+
+            if shape.counted:
+                result = {
+                    'episodes': episodes,
+                    'count': len(episodes),
+                    'nextCursor': pagination['nextCursor'] if pagination else None
+                }
+            else:
+                result = {'episodes': episodes}
+                if pagination is not None:
+                    result['pagination'] = pagination
+            result.update(self.episode_catalog.flags())
+            return result
+
+        except Exception as error:
+            if shape.counted:
+                return {
+                    'error': f"Error fetching episodes: {str(error)}",
+                    'episodes': [],
+                    'count': 0,
+                    'nextCursor': None
+                }
+            return {'error': f"Error fetching episodes: {str(error)}", 'episodes': []}
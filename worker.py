@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Wild Kratts catalog sync worker
+
+Crawls the full episode and product catalogs on a schedule and writes them to
+the local snapshot database. Web processes sharing CATALOG_SNAPSHOT_DIR serve
+every tool call from those snapshots instead of calling upstream.
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import time
+
+from catalog import EpisodeCatalog, ProductCatalog
+from snapshot import snapshot_path
+from upstream import EPISODES_API, PRODUCTS_API, upstream
+
+logger = logging.getLogger("worker")
+
+SYNC_INTERVAL = float(os.environ.get("CATALOG_SYNC_INTERVAL", "900"))
+
+
+async def sync_catalogs() -> bool:
+    """Crawl each catalog and replace its snapshot under its refresh lease; returns False if any catalog failed"""
+    ok = True
+    for catalog in (EpisodeCatalog(EPISODES_API), ProductCatalog(PRODUCTS_API)):
+        started = time.monotonic()
+        try:
+            if await catalog.sync():
+                logger.info("Synced %d %s in %.1fs", len(catalog.items), catalog.snapshot_name,
+                            time.monotonic() - started)
+            else:
+                logger.info("Skipped %s: another process holds its refresh lease", catalog.snapshot_name)
+        except Exception as error:
+            # Leave the previous snapshot in place; the web process keeps serving it
+            logger.error("Failed to sync %s: %s", catalog.snapshot_name, error)
+            ok = False
+    return ok
+
+
+async def run(once: bool = False, interval: float = SYNC_INTERVAL) -> bool:
+    """Sync on a fixed schedule until cancelled, or a single time with once=True"""
+    async with upstream:
+        while True:
+            ok = await sync_catalogs()
+            if once:
+                return ok
+            await asyncio.sleep(interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync Wild Kratts catalogs to a local snapshot")
+    parser.add_argument("--once", action="store_true", help="Sync a single time and exit")
+    parser.add_argument("--interval", type=float, default=SYNC_INTERVAL,
+                        help="Seconds between syncs (default: %(default)s)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [worker] %(message)s")
+    logger.info("Writing catalog snapshots to %s", os.path.abspath(snapshot_path()))
+
+    try:
+        ok = asyncio.run(run(once=args.once, interval=args.interval))
+    except KeyboardInterrupt:
+        ok = True
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()